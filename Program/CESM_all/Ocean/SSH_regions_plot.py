@@ -4,12 +4,18 @@ from pylab import *
 import numpy
 import datetime
 import time
-import glob, os
+import glob, os, sys
 import math
 import netCDF4 as netcdf
 import matplotlib.colors as colors
 from scipy import stats
 
+#Shared functions, relative to this directory
+sys.path.append('../../')
+from Functions.Data_access import ReadVariables, ReadinDataGlobalMean, ReadinDataGlobalSteric
+from Functions.Yearly_converter import YearlyConverter
+from Functions.Significant_trend import SignificantTrend
+
 #Making pathway to folder with all data
 directory_cesm 		    = '../../../Data/HR-CESM/'
 directory_cesm_low          = '../../../Data/LR-CESM/'
@@ -18,66 +24,11 @@ directory_cesm_low_control  = '../../../Data/LR-CESM_Control/'
 
 def ReadinData(filename):
 	"""Reads-in the data"""
-	HEAT_data 		= netcdf.Dataset(filename, 'r')
-
-	time			= HEAT_data.variables['time'][:] 
-	ssh_1			= HEAT_data.variables['SSH_region_1'][:] 						
-	ssh_2			= HEAT_data.variables['SSH_region_2'][:] 
 
-	HEAT_data.close()
+	time, ssh_1, ssh_2	= ReadVariables(filename, ['time', 'SSH_region_1', 'SSH_region_2'])
 
 	return time, ssh_1, ssh_2
 
-def ReadinDataGlobalMean(filename):
-	"""Reads-in the global mean sea surface height (cm)"""
-	HEAT_data 		= netcdf.Dataset(filename, 'r')
-
-	time			= HEAT_data.variables['time'][:] 
-	ssh_global		= HEAT_data.variables['SSH_global'][:] 						
-
-	HEAT_data.close()
-
-	return time, ssh_global
-	
-def YearlyConverter(time, data, month_start = 1, month_end = 12):
-	"""Determines the averaged value over different months of choice,
-	default is set to January - December"""
-
-	#Take twice the amount of years for the month day (no leap year)
-	month_days	= np.asarray([31., 28., 31., 30., 31., 30., 31., 31., 30., 31., 30., 31., 31., 28., 31., 30., 31., 30., 31., 31., 30., 31., 30., 31.])
-	month_days	= month_days[month_start - 1:month_end]
-	month_days	= month_days / np.sum(month_days)
-
-	if month_end <= 12:
-		#Normal average over a single year, for example, January 100 - December 100
-		time_year		= np.zeros(len(time) / 12)
-
-	else:
-		#If you take the average, for example, over November 100 - May 101
-		#Take year 101 as the average over this period
-		#There is one year less compared to the period analysed
-		time_year		= np.zeros(len(time) / 12 - 1)
-
-	#-----------------------------------------------------------------------------------------
-	data_year	= ma.masked_all(len(time_year))
-
-	for year_i in range(len(time_year)):
-		#Determine the average over the selected months
-
-		#The year is defined as the current year
-		year			= int(str(datetime.date.fromordinal(int(time[year_i * 12])))[0:4])
-
-		if month_end	>= 13:
-			#If average is taken over, for example, November 100 - May 101, the year is defined as 101
-			year = year + 1
-
-		time_year[year_i] 	= datetime.datetime(year, 1, 1).toordinal()
-
-		#Determine the time mean over the months of choice
-		data_year[year_i]		= np.sum(data[year_i * 12 + month_start - 1: year_i * 12 + month_end] * month_days, axis = 0)
-
-	return time_year, data_year
-
 def TrendRemover(time, data, trend_type):
 	"""Removes trend of choice"""
 	
@@ -92,45 +43,6 @@ def TrendRemover(time, data, trend_type):
 	
 	return data
 
-def SignificantTrend(time, data):
-	"""Finds whether trend is significant
-	Returns the trend and if it significant (= 1)"""
-
-	#Set time similar to Santer et al. (2000), time array from 1 till N
-	#Statistical significance of trends and trend differences in layer-average atmospheric temperature time series
-	time		= np.arange(1, len(time) + 1)
-
-	#Determine the detrended time series
-	trend, base 	= polyfit(time, data, 1)
-	data_res	= data - ((trend * time) + base)
-
-	#Effective sample size, based on the lag-1 correlation
-	corr_1		= np.corrcoef(data_res[:-1], data_res[1:])[0, 1]
-	N_eff		= int(len(time) * (1.0 - corr_1) / (1.0 + corr_1))
-
-	#Determine the variance of the anomalies
-	data_var	= np.sum(data_res**2.0) / (N_eff - 2.0)
-
-	#Determine the standard error
-	standard_error	=  np.sqrt(data_var) / np.sqrt(np.sum((time - np.mean(time))**2.0))
-
-	#Determine the Student-T value
-	t_value		= trend / standard_error
-
-	#Get the significance levels and the corresponding critical values (two-sided)
-	sig_levels 	= np.arange(50, 100, 0.5) / 100.0
-	t_crit 		= stats.t.ppf((1.0 + sig_levels) / 2.0, N_eff - 2)
-
-	#Get the indices where the significance is exceeding the critical values
-	sig_index	= np.where(fabs(t_value) > t_crit)[0]
-	significant	= 0.0
-
-	if len(sig_index) > 0:
-		#If there are significance values, take the highest significant level
-		significant = sig_levels[sig_index[-1]]
-
-	return trend, np.sqrt(standard_error), significant
-
 #-----------------------------------------------------------------------------------------
 #--------------------------------MAIN SCRIPT STARTS HERE----------------------------------
 #-----------------------------------------------------------------------------------------
@@ -179,24 +91,14 @@ print 'LR-CESM DSL 2:', SignificantTrend(time_year_cesm, ssh_year_2_cesm_low)[0]
 
 #-----------------------------------------------------------------------------------------
 
-HEAT_data 	                                = netcdf.Dataset(directory_cesm+'Ocean/SSH_global_steric.nc', 'r')
-
-time		                                = HEAT_data.variables['time'][:] 
-steric_global_cesm                              = HEAT_data.variables['SSH'][:] * 100.0
-
-HEAT_data.close()
+time, steric_global_cesm                        = ReadinDataGlobalSteric(directory_cesm+'Ocean/SSH_global_steric.nc')
 
 time_year_cesm, steric_global_year_cesm	        = YearlyConverter(time, steric_global_cesm, month_start, month_end)
 steric_global_year_cesm			        = steric_global_year_cesm - steric_global_year_cesm[0]
 
 #-----------------------------------------------------------------------------------------
 
-HEAT_data 	                                = netcdf.Dataset(directory_cesm_control+'Ocean/SSH_global_steric.nc', 'r')
-
-time		                                = HEAT_data.variables['time'][:] 
-steric_global_cesm_control                      = HEAT_data.variables['SSH'][:] * 100.0
-
-HEAT_data.close()
+time, steric_global_cesm_control                = ReadinDataGlobalSteric(directory_cesm_control+'Ocean/SSH_global_steric.nc')
 
 time_year_2, steric_global_year_cesm_control	= YearlyConverter(time, steric_global_cesm_control, month_start, month_end)
 steric_global_year_cesm_control			= steric_global_year_cesm_control - steric_global_year_cesm_control[0]
@@ -208,24 +110,14 @@ ssh_total_year_2_cesm	                        = ssh_year_2_cesm + steric_global_
 
 #-----------------------------------------------------------------------------------------
 
-HEAT_data 	                                = netcdf.Dataset(directory_cesm_low+'Ocean/SSH_global_steric.nc', 'r')
-
-time_low		                        = HEAT_data.variables['time'][:] 
-steric_global_cesm_low                          = HEAT_data.variables['SSH'][:] * 100.0
-
-HEAT_data.close()
+time_low, steric_global_cesm_low                = ReadinDataGlobalSteric(directory_cesm_low+'Ocean/SSH_global_steric.nc')
 
 time_year_cesm_low, steric_global_year_cesm_low = YearlyConverter(time_low, steric_global_cesm_low, month_start, month_end)
 steric_global_year_cesm_low			= steric_global_year_cesm_low - steric_global_year_cesm_low[0]
 
 #-----------------------------------------------------------------------------------------
 
-HEAT_data 	                                = netcdf.Dataset(directory_cesm_low_control+'Ocean/SSH_global_steric.nc', 'r')
-
-time		                                = HEAT_data.variables['time'][:] 
-steric_global_cesm_low_control                  = HEAT_data.variables['SSH'][:] * 100.0
-
-HEAT_data.close()
+time, steric_global_cesm_low_control            = ReadinDataGlobalSteric(directory_cesm_low_control+'Ocean/SSH_global_steric.nc')
 
 time_year_2, steric_global_year_cesm_low_control= YearlyConverter(time, steric_global_cesm_low_control, month_start, month_end)
 steric_global_year_cesm_low_control		= steric_global_year_cesm_low_control - steric_global_year_cesm_low_control[0]
@@ -0,0 +1,73 @@
+#Program plots the SDSL trend over a shorter period of time for a grid point of choice
+
+from pylab import *
+import numpy
+import datetime
+import time
+import glob, os, sys
+import math
+import netCDF4 as netcdf
+import matplotlib.colors as colors
+
+#Shared functions, relative to this directory
+sys.path.append('../../')
+from Functions.Product_registry import RequireProduct
+from Functions.Trend_sections_grid import ReadinTrendSectionsPoint
+
+#-----------------------------------------------------------------------------------------
+#--------------------------------MAIN SCRIPT STARTS HERE----------------------------------
+#-----------------------------------------------------------------------------------------
+
+month_start	= 1 	#1 = January, 2 = February, 3 = March, ..., 13 = January (+ 1), ...
+month_end	= 12	#12 = December, 13 = January (+ 1), 14 = February (+ 1), ...
+
+lon_point	= 280.5	#Centre of region 1
+lat_point	= 12.0
+
+#-----------------------------------------------------------------------------------------
+
+for run_i, run in enumerate(['HR-CESM', 'LR-CESM']):
+	#Get the file of the product, which is generated first when not available (the full grid of the domain)
+	filename	= RequireProduct('SSH_trend_sections', run, month_start = month_start, month_end = month_end)
+
+	#Only the (start year, end year) panel of the grid point, a single read
+	#The sections shorter than section_length_min (or without a steric trend) are masked and left blank
+	time_year, lon_i, lat_i, trend_sections	= ReadinTrendSectionsPoint(filename, lon_point, lat_point)
+
+	fh			= netcdf.Dataset(filename, 'r')
+	section_length_min	= fh.variables['SSH_trend_norm'].section_length_min
+	fh.close()
+
+	#-----------------------------------------------------------------------------------------
+	fig, ax	= subplots()
+
+	levels	= np.arange(-1, 3.01, 0.05)
+	levels	= np.delete(levels, (fabs(levels - 1.0)).argmin())
+
+	x, y	= np.meshgrid(time_year, time_year)
+	CS	= contourf(x, y, trend_sections, levels, extend = 'both', cmap = 'bwr')
+	cbar	= colorbar(CS, ticks = np.arange(-1, 3.01, 1))
+	cbar.set_label('Normalised SDSL trend')
+	ax.xaxis_date()
+	ax.yaxis_date()
+
+	ax.set_xlabel('Model year trend end')
+	ax.set_ylabel('Model year trend start')
+
+	ax.set_title(['a', 'b'][run_i]+') '+run+', '+str(round(lon_i, 1))+'$^{\circ}$E, '+str(round(lat_i, 1))+'$^{\circ}$N')
+
+	ax2 	= fig.add_axes([0.2, 0.62, 0.5, 0.2])
+
+	index	= np.arange(0, len(time_year) - section_length_min)
+	graph	= ax2.plot_date(time_year[:len(index)], trend_sections[index, index + section_length_min], '-r', linewidth = 2.0)
+
+	ax2.set_xlabel('Model year trend start')
+	ax2.set_ylabel('Normalised SDSL trend')
+	ax2.set_ylim(-1, 3)
+	ax2.set_title('Fixed period of '+str(section_length_min)+' years')
+	ax2.grid()
+
+	ax2.set_xticks([datetime.datetime(year, 1, 1).toordinal() for year in range(2000, 2081, 10)])
+	ax2.set_yticks(np.arange(-1, 3.01, 1))
+
+show()
@@ -4,12 +4,18 @@ from pylab import *
 import numpy
 import datetime
 import time
-import glob, os
+import glob, os, sys
 import math
 import netCDF4 as netcdf
 import matplotlib.colors as colors
 from scipy import stats
 
+#Shared functions, relative to this directory
+sys.path.append('../../')
+from Functions.Data_access import ReadVariables, ReadinDataGlobalMean, ReadinDataGlobalSteric
+from Functions.Yearly_converter import YearlyConverter, YearlyConverterBatch, SeasonalSweep
+from Functions.Significant_trend import SignificantTrend, TrendSections
+
 #Making pathway to folder with all data
 directory_cesm 		    = '../../../Data/HR-CESM/'
 directory_cesm_low          = '../../../Data/LR-CESM/'
@@ -19,66 +25,11 @@ directory_cesm_low_control  = '../../../Data/LR-CESM_Control/'
 
 def ReadinData(filename):
 	"""Reads-in the data"""
-	HEAT_data 		= netcdf.Dataset(filename, 'r')
-
-	time			= HEAT_data.variables['time'][:] 
-	ssh_1			= HEAT_data.variables['SSH_region_1'][:] 						
-	ssh_2			= HEAT_data.variables['SSH_region_2'][:] 
 
-	HEAT_data.close()
+	time, ssh_1, ssh_2	= ReadVariables(filename, ['time', 'SSH_region_1', 'SSH_region_2'])
 
 	return time, ssh_1, ssh_2
 
-def ReadinDataGlobalMean(filename):
-	"""Reads-in the global mean sea surface height (cm)"""
-	HEAT_data 		= netcdf.Dataset(filename, 'r')
-
-	time			= HEAT_data.variables['time'][:] 
-	ssh_global		= HEAT_data.variables['SSH_global'][:] 						
-
-	HEAT_data.close()
-
-	return time, ssh_global
-	
-def YearlyConverter(time, data, month_start = 1, month_end = 12):
-	"""Determines the averaged value over different months of choice,
-	default is set to January - December"""
-
-	#Take twice the amount of years for the month day (no leap year)
-	month_days	= np.asarray([31., 28., 31., 30., 31., 30., 31., 31., 30., 31., 30., 31., 31., 28., 31., 30., 31., 30., 31., 31., 30., 31., 30., 31.])
-	month_days	= month_days[month_start - 1:month_end]
-	month_days	= month_days / np.sum(month_days)
-
-	if month_end <= 12:
-		#Normal average over a single year, for example, January 100 - December 100
-		time_year		= np.zeros(len(time) / 12)
-
-	else:
-		#If you take the average, for example, over November 100 - May 101
-		#Take year 101 as the average over this period
-		#There is one year less compared to the period analysed
-		time_year		= np.zeros(len(time) / 12 - 1)
-
-	#-----------------------------------------------------------------------------------------
-	data_year	= ma.masked_all(len(time_year))
-
-	for year_i in range(len(time_year)):
-		#Determine the average over the selected months
-
-		#The year is defined as the current year
-		year			= int(str(datetime.date.fromordinal(int(time[year_i * 12])))[0:4])
-
-		if month_end	>= 13:
-			#If average is taken over, for example, November 100 - May 101, the year is defined as 101
-			year = year + 1
-
-		time_year[year_i] 	= datetime.datetime(year, 1, 1).toordinal()
-
-		#Determine the time mean over the months of choice
-		data_year[year_i]		= np.sum(data[year_i * 12 + month_start - 1: year_i * 12 + month_end] * month_days, axis = 0)
-
-	return time_year, data_year
-
 def TrendRemover(time, data, trend_type):
 	"""Removes trend of choice"""
 	
@@ -93,44 +44,40 @@ def TrendRemover(time, data, trend_type):
 	
 	return data
 
-def SignificantTrend(time, data):
-	"""Finds whether trend is significant
-	Returns the trend and if it significant (= 1)"""
+def SeasonalTrends(time, data, time_control, steric_control):
+	"""Returns the normalised SDSL trend (full period) of region 1 and 2 for all the month windows (region, start, end),
+	data contains the monthly sea surface height of region 1 and 2, the global mean and the global steric sea level
+	All windows are averaged in one pass (see SeasonalSweep), invalid windows are masked"""
 
-	#Set time similar to Santer et al. (2000), time array from 1 till N
-	#Statistical significance of trends and trend differences in layer-average atmospheric temperature time series
-	time		= np.arange(1, len(time) + 1)
+	time_year, data_sweep		= SeasonalSweep(time, data)
+	time_year_2, control_sweep	= SeasonalSweep(time_control, steric_control)
+	number_years			= min(len(time_year), len(time_year_2))
 
-	#Determine the detrended time series
-	trend, base 	= polyfit(time, data, 1)
-	data_res	= data - ((trend * time) + base)
+	trend_norm			= ma.masked_all((2, 12, 24))
 
-	#Effective sample size, based on the lag-1 correlation
-	corr_1		= np.corrcoef(data_res[:-1], data_res[1:])[0, 1]
-	N_eff		= int(len(time) * (1.0 - corr_1) / (1.0 + corr_1))
+	for start_i in range(12):
+		for end_i in range(24):
+			#Only the years with all the series (the first year is masked for the windows over two years)
+			valid	= ~np.any(ma.getmaskarray(data_sweep[start_i, end_i, :number_years]), axis = 1) & ~ma.getmaskarray(control_sweep[start_i, end_i, :number_years])
+			valid	= np.where(valid)[0]
 
-	#Determine the variance of the anomalies
-	data_var	= np.sum(data_res**2.0) / (N_eff - 2.0)
+			if len(valid) < 2:
+				continue
 
-	#Determine the standard error
-	standard_error	=  np.sqrt(data_var) / np.sqrt(np.sum((time - np.mean(time))**2.0))
+			series	= ma.getdata(data_sweep[start_i, end_i, valid])
+			control	= ma.getdata(control_sweep[start_i, end_i, valid])
 
-	#Determine the Student-T value
-	t_value		= trend / standard_error
+			#Drift-corrected global steric sea level, relative to the first year
+			steric	= series[:, 3] - series[0, 3] - (control - control[0])
+			trend_steric	= polyfit(valid, steric, 1)[0]
 
-	#Get the significance levels and the corresponding critical values (two-sided)
-	sig_levels 	= np.arange(50, 100, 0.5) / 100.0
-	t_crit 		= stats.t.ppf((1.0 + sig_levels) / 2.0, N_eff - 2)
+			for region_i in range(2):
+				ssh	= series[:, region_i] - series[:, 2]
+				ssh	= ssh - ssh[0] + steric
 
-	#Get the indices where the significance is exceeding the critical values
-	sig_index	= np.where(fabs(t_value) > t_crit)[0]
-	significant	= 0.0
+				trend_norm[region_i, start_i, end_i]	= polyfit(valid, ssh, 1)[0] / trend_steric
 
-	if len(sig_index) > 0:
-		#If there are significance values, take the highest significant level
-		significant = sig_levels[sig_index[-1]]
-
-	return trend, np.sqrt(standard_error), significant
+	return trend_norm
 
 #-----------------------------------------------------------------------------------------
 #--------------------------------MAIN SCRIPT STARTS HERE----------------------------------
@@ -138,57 +85,49 @@ def SignificantTrend(time, data):
 
 month_start	= 1 	#1 = January, 2 = February, 3 = March, ..., 13 = January (+ 1), ...
 month_end	= 12	#12 = December, 13 = January (+ 1), 14 = February (+ 1), ...
+season_sweep	= False	#Normalised SDSL trend of region 1 and 2 for all the month windows (start 1 - 12, end 1 - 24)
 
 #-----------------------------------------------------------------------------------------
 time_cesm, ssh_1_cesm, ssh_2_cesm	        = ReadinData(directory_cesm+'Ocean/SSH_regions.nc')
-time_year_cesm, ssh_year_1_cesm			= YearlyConverter(time_cesm, ssh_1_cesm, month_start, month_end)
-time_year_cesm, ssh_year_2_cesm			= YearlyConverter(time_cesm, ssh_2_cesm, month_start, month_end)
+time_2, ssh_global_cesm				= ReadinDataGlobalMean(directory_cesm+'Ocean/SSH_global.nc')
+time_2, steric_global_cesm			= ReadinDataGlobalSteric(directory_cesm+'Ocean/SSH_global_steric.nc')
 
-time_cesm, ssh_global_cesm			= ReadinDataGlobalMean(directory_cesm+'Ocean/SSH_global.nc')
-time_year_cesm, ssh_global_year_cesm		= YearlyConverter(time_cesm, ssh_global_cesm, month_start, month_end)
+#Convert all the series in one pass, the time axis is only decoded once
+time_year_cesm, ssh_year_cesm			= YearlyConverterBatch(time_cesm, {'region_1': ssh_1_cesm, 'region_2': ssh_2_cesm, 'global': ssh_global_cesm, 'steric': steric_global_cesm}, month_start, month_end)
+time_year					= time_year_cesm
 
-ssh_year_1_cesm					= ssh_year_1_cesm - ssh_global_year_cesm
-ssh_year_2_cesm					= ssh_year_2_cesm - ssh_global_year_cesm
+ssh_year_1_cesm					= ssh_year_cesm['region_1'] - ssh_year_cesm['global']
+ssh_year_2_cesm					= ssh_year_cesm['region_2'] - ssh_year_cesm['global']
 ssh_year_1_cesm					= ssh_year_1_cesm - ssh_year_1_cesm[0]
 ssh_year_2_cesm					= ssh_year_2_cesm - ssh_year_2_cesm[0]	
+steric_global_year_cesm			        = ssh_year_cesm['steric'] - ssh_year_cesm['steric'][0]
 
 #-----------------------------------------------------------------------------------------
 time_cesm_low, ssh_1_cesm_low, ssh_2_cesm_low	= ReadinData(directory_cesm_low+'/Ocean/SSH_regions.nc')
-time_year_cesm_low, ssh_year_1_cesm_low		= YearlyConverter(time_cesm_low, ssh_1_cesm_low, month_start, month_end)
-time_year_cesm_low, ssh_year_2_cesm_low		= YearlyConverter(time_cesm_low, ssh_2_cesm_low, month_start, month_end)
+time_2, ssh_global_cesm_low			= ReadinDataGlobalMean(directory_cesm_low+'Ocean/SSH_global.nc')
+time_2, steric_global_cesm_low			= ReadinDataGlobalSteric(directory_cesm_low+'Ocean/SSH_global_steric.nc')
 
-time_cesm_low, ssh_global_cesm_low		= ReadinDataGlobalMean(directory_cesm_low+'Ocean/SSH_global.nc')
-time_year_cesm_low, ssh_global_year_cesm_low	= YearlyConverter(time_cesm_low, ssh_global_cesm_low, month_start, month_end)
+#Convert all the series in one pass, the time axis is only decoded once
+time_year_cesm_low, ssh_year_cesm_low		= YearlyConverterBatch(time_cesm_low, {'region_1': ssh_1_cesm_low, 'region_2': ssh_2_cesm_low, 'global': ssh_global_cesm_low, 'steric': steric_global_cesm_low}, month_start, month_end)
 
-ssh_year_1_cesm_low				= ssh_year_1_cesm_low - ssh_global_year_cesm_low
-ssh_year_2_cesm_low				= ssh_year_2_cesm_low - ssh_global_year_cesm_low
+ssh_year_1_cesm_low				= ssh_year_cesm_low['region_1'] - ssh_year_cesm_low['global']
+ssh_year_2_cesm_low				= ssh_year_cesm_low['region_2'] - ssh_year_cesm_low['global']
 ssh_year_1_cesm_low				= ssh_year_1_cesm_low - ssh_year_1_cesm_low[0]
 ssh_year_2_cesm_low				= ssh_year_2_cesm_low - ssh_year_2_cesm_low[0]
-#-----------------------------------------------------------------------------------------
-
-HEAT_data 	                                = netcdf.Dataset(directory_cesm+'Ocean/SSH_global_steric.nc', 'r')
-
-time		                                = HEAT_data.variables['time'][:] 
-steric_global_cesm                              = HEAT_data.variables['SSH'][:] * 100.0
-
-HEAT_data.close()
-
-time_year, steric_global_year_cesm	        = YearlyConverter(time, steric_global_cesm, month_start, month_end)
-steric_global_year_cesm			        = steric_global_year_cesm - steric_global_year_cesm[0]
-
+steric_global_year_cesm_low			= ssh_year_cesm_low['steric'] - ssh_year_cesm_low['steric'][0]
 
 #-----------------------------------------------------------------------------------------
-
-HEAT_data 	                                = netcdf.Dataset(directory_cesm_control+'Ocean/SSH_global_steric.nc', 'r')
-
-time		                                = HEAT_data.variables['time'][:] 
-steric_global_cesm_control                      = HEAT_data.variables['SSH'][:] * 100.0
-
-HEAT_data.close()
-
+#The control simulations have their own time axis
+time, steric_global_cesm_control		= ReadinDataGlobalSteric(directory_cesm_control+'Ocean/SSH_global_steric.nc')
 time_year_2, steric_global_year_cesm_control	= YearlyConverter(time, steric_global_cesm_control, month_start, month_end)
 steric_global_year_cesm_control			= steric_global_year_cesm_control - steric_global_year_cesm_control[0]
 
+time, steric_global_cesm_low_control		= ReadinDataGlobalSteric(directory_cesm_low_control+'Ocean/SSH_global_steric.nc')
+time_year_2, steric_global_year_cesm_low_control= YearlyConverter(time, steric_global_cesm_low_control, month_start, month_end)
+steric_global_year_cesm_low_control		= steric_global_year_cesm_low_control - steric_global_year_cesm_low_control[0]
+
+#-----------------------------------------------------------------------------------------
+
 #Adjust for drift
 steric_global_year_cesm		                = steric_global_year_cesm - steric_global_year_cesm_control
 ssh_total_year_1_cesm	                        = ssh_year_1_cesm + steric_global_year_cesm	
@@ -197,30 +136,6 @@ ssh_total_year_2_cesm	                        = ssh_year_2_cesm + steric_global_
 #Determine the trend over the entire period (2000 - 21000)
 trend_ssh_year, base_ssh_year	                = polyfit(np.arange(len(time_year)), steric_global_year_cesm, 1)
 
-#-----------------------------------------------------------------------------------------
-
-HEAT_data 	                                = netcdf.Dataset(directory_cesm_low+'Ocean/SSH_global_steric.nc', 'r')
-
-time_low		                        = HEAT_data.variables['time'][:] 
-steric_global_cesm_low                          = HEAT_data.variables['SSH'][:] * 100.0
-
-HEAT_data.close()
-
-time_year_cesm_low, steric_global_year_cesm_low = YearlyConverter(time_low, steric_global_cesm_low, month_start, month_end)
-steric_global_year_cesm_low			= steric_global_year_cesm_low - steric_global_year_cesm_low[0]
-
-#-----------------------------------------------------------------------------------------
-
-HEAT_data 	                                = netcdf.Dataset(directory_cesm_low_control+'Ocean/SSH_global_steric.nc', 'r')
-
-time		                                = HEAT_data.variables['time'][:] 
-steric_global_cesm_low_control                  = HEAT_data.variables['SSH'][:] * 100.0
-
-HEAT_data.close()
-
-time_year_2, steric_global_year_cesm_low_control= YearlyConverter(time, steric_global_cesm_low_control, month_start, month_end)
-steric_global_year_cesm_low_control		= steric_global_year_cesm_low_control - steric_global_year_cesm_low_control[0]
-
 #Adjust for drift
 steric_global_year_cesm_low		        = steric_global_year_cesm_low - steric_global_year_cesm_low_control
 ssh_total_year_1_cesm_low	                = ssh_year_1_cesm_low + steric_global_year_cesm_low	
@@ -241,36 +156,23 @@ dynamic_trend_cesm_low_2    = SignificantTrend(time_year, ssh_total_year_2_cesm_
 #-----------------------------------------------------------------------------------------
 
 section_length_min	= 25
-trend_sections_1	= np.ones((len(time_year), len(time_year)))
-trend_sections_2	= np.ones((len(time_year), len(time_year)))
-trend_sections_1_low	= np.ones((len(time_year), len(time_year)))
-trend_sections_2_low	= np.ones((len(time_year), len(time_year)))
-
 
-for year_i in range(len(time_year) - section_length_min + 1):
-	for year_j in range(year_i + section_length_min - 1, len(time_year)):
+#Determine the trends (per decade) over all sections from the prefix sums
+#The sections shorter than section_length_min (or without a steric trend) remain masked and are left blank in the plots
+trend_steric			= TrendSections(steric_global_year_cesm, section_length_min) * 10.0
+trend_1				= TrendSections(ssh_year_1_cesm + steric_global_year_cesm, section_length_min) * 10.0
+trend_2				= TrendSections(ssh_year_2_cesm + steric_global_year_cesm, section_length_min) * 10.0
 
-		#High resolution
-		ssh_1, ssh_2, ssh_steric	= ssh_year_1_cesm[year_i:year_j + 1], ssh_year_2_cesm[year_i:year_j + 1], steric_global_year_cesm[year_i:year_j + 1]
+trend_sections_1		= trend_1 / trend_steric
+trend_sections_2		= trend_2 / trend_steric
 
-		#Determine the trends
-		trend_1, base			= polyfit(np.arange(len(ssh_1)), ssh_1 + ssh_steric, 1) * 10.0
-		trend_2, base			= polyfit(np.arange(len(ssh_1)), ssh_2 + ssh_steric, 1) * 10.0
-		trend_steric, base		= polyfit(np.arange(len(ssh_1)), ssh_steric, 1) * 10.0
+trend_steric			= TrendSections(steric_global_year_cesm_low, section_length_min) * 10.0
+trend_1				= TrendSections(ssh_year_1_cesm_low + steric_global_year_cesm_low, section_length_min) * 10.0
+trend_2				= TrendSections(ssh_year_2_cesm_low + steric_global_year_cesm_low, section_length_min) * 10.0
 
-		trend_sections_1[year_i, year_j]	= trend_1 / trend_steric
-		trend_sections_2[year_i, year_j]	= trend_2 / trend_steric
+trend_sections_1_low		= trend_1 / trend_steric
+trend_sections_2_low		= trend_2 / trend_steric
 
-		#Low resolution
-		ssh_1, ssh_2, ssh_steric	= ssh_year_1_cesm_low[year_i:year_j + 1], ssh_year_2_cesm_low[year_i:year_j + 1], steric_global_year_cesm_low[year_i:year_j + 1]
-
-		#Determine the trends
-		trend_1, base			= polyfit(np.arange(len(ssh_1)), ssh_1 + ssh_steric, 1) * 10.0
-		trend_2, base			= polyfit(np.arange(len(ssh_1)), ssh_2 + ssh_steric, 1) * 10.0
-		trend_steric, base		= polyfit(np.arange(len(ssh_1)), ssh_steric, 1) * 10.0
-
-		trend_sections_1_low[year_i, year_j]	= trend_1 / trend_steric
-		trend_sections_2_low[year_i, year_j]	= trend_2 / trend_steric
 #-----------------------------------------------------------------------------------------
 fig, ax	= subplots()
 
@@ -430,4 +332,32 @@ ax2.set_xticks([datetime.datetime(2000, 1, 1).toordinal(),
 
 ax2.set_yticks(np.arange(-1, 3.01, 1))
 
+#-----------------------------------------------------------------------------------------
+
+if season_sweep:
+	for directory_run, directory_control, run in [[directory_cesm, directory_cesm_control, 'HR-CESM'], [directory_cesm_low, directory_cesm_low_control, 'LR-CESM']]:
+		#All the series of the run share the time axis, the control simulation has its own
+		time, ssh_1, ssh_2	= ReadinData(directory_run+'Ocean/SSH_regions.nc')
+		time_2, ssh_global	= ReadinDataGlobalMean(directory_run+'Ocean/SSH_global.nc')
+		time_2, steric_global	= ReadinDataGlobalSteric(directory_run+'Ocean/SSH_global_steric.nc')
+		time_control, steric_control	= ReadinDataGlobalSteric(directory_control+'Ocean/SSH_global_steric.nc')
+
+		trend_norm	= SeasonalTrends(time, np.transpose([ssh_1, ssh_2, ssh_global, steric_global]), time_control, steric_control)
+
+		fig, axes	= subplots(1, 2, figsize = (12, 5))
+
+		for region_i, ax in enumerate(axes):
+			#The invalid windows (end before start) are left blank
+			CS	= ax.pcolormesh(np.arange(0.5, 24.6, 1), np.arange(0.5, 12.6, 1), trend_norm[region_i], vmin = -1, vmax = 3, cmap = 'bwr')
+
+			ax.plot(month_end, month_start, 'xk', markersize = 10, markeredgewidth = 2.0)
+			ax.set_xlabel('Month end (13 = January (+ 1), ...)')
+			ax.set_ylabel('Month start')
+			ax.set_xticks(np.arange(1, 25, 2))
+			ax.set_yticks(np.arange(1, 13, 1))
+			ax.set_title(run+', region '+str(region_i + 1))
+
+		cbar	= fig.colorbar(CS, ax = list(axes), ticks = np.arange(-1, 3.01, 1))
+		cbar.set_label('Normalised SDSL trend')
+
 show()
@@ -4,92 +4,15 @@ from pylab import *
 import numpy
 import datetime
 import time
-import glob, os
+import glob, os, sys
 import math
 import netCDF4 as netcdf
 import matplotlib.colors as colors
 from scipy import stats
 
-#Making pathway to folder with all data
-directory_CMIP6		    = '../../../Data/CMIP6/'
-directory_cesm 		    = '../../../Data/HR-CESM/'
-directory_cesm_low          = '../../../Data/LR-CESM/'
-directory_cesm_control 	    = '../../../Data/HR-CESM_Control/'
-directory_cesm_low_control  = '../../../Data/LR-CESM_Control/'
-directory_aviso 	    = '../../../Data/AVISO/'
-
-def ReadinData(filename):
-	"""Reads-in the data"""
-	HEAT_data 		= netcdf.Dataset(filename, 'r')
-
-	time			= HEAT_data.variables['time'][:] 
-	ssh_1			= HEAT_data.variables['SSH_region_1'][:] 						
-	ssh_2			= HEAT_data.variables['SSH_region_2'][:] 
-
-	HEAT_data.close()
-
-	return time, ssh_1, ssh_2
-
-def ReadinDataGlobalMean(filename):
-	"""Reads-in the global mean sea surface height (cm)"""
-	HEAT_data 		= netcdf.Dataset(filename, 'r')
-
-	time			= HEAT_data.variables['time'][:] 
-	ssh_global		= HEAT_data.variables['SSH_global'][:] 						
-
-	HEAT_data.close()
-
-	return time, ssh_global
-	
-def ReadinDataGlobalSteric(filename):
-	"""Reads-in the global data"""
-	HEAT_data 		= netcdf.Dataset(filename, 'r')
-
-	time			= HEAT_data.variables['time'][:] 
-	ssh			= HEAT_data.variables['SSH'][:] * 100.0	#Global steric (cm)				
-
-	HEAT_data.close()
-
-	return time, ssh
-
-def YearlyConverter(time, data, month_start = 1, month_end = 12):
-	"""Determines the averaged value over different months of choice,
-	default is set to January - December"""
-
-	#Take twice the amount of years for the month day (no leap year)
-	month_days	= np.asarray([31., 28., 31., 30., 31., 30., 31., 31., 30., 31., 30., 31., 31., 28., 31., 30., 31., 30., 31., 31., 30., 31., 30., 31.])
-	month_days	= month_days[month_start - 1:month_end]
-	month_days	= month_days / np.sum(month_days)
-
-	if month_end <= 12:
-		#Normal average over a single year, for example, January 100 - December 100
-		time_year		= np.zeros(len(time) / 12)
-
-	else:
-		#If you take the average, for example, over November 100 - May 101
-		#Take year 101 as the average over this period
-		#There is one year less compared to the period analysed
-		time_year		= np.zeros(len(time) / 12 - 1)
-
-	#-----------------------------------------------------------------------------------------
-	data_year	= ma.masked_all(len(time_year))
-
-	for year_i in range(len(time_year)):
-		#Determine the average over the selected months
-
-		#The year is defined as the current year
-		year			= int(str(datetime.date.fromordinal(int(time[year_i * 12])))[0:4])
-
-		if month_end	>= 13:
-			#If average is taken over, for example, November 100 - May 101, the year is defined as 101
-			year = year + 1
-
-		time_year[year_i] 	= datetime.datetime(year, 1, 1).toordinal()
-
-		#Determine the time mean over the months of choice
-		data_year[year_i]		= np.sum(data[year_i * 12 + month_start - 1: year_i * 12 + month_end] * month_days, axis = 0)
-
-	return time_year, data_year
+#Shared functions, relative to this directory
+sys.path.append('../../')
+from Functions.Ensemble_cube import EnsembleCube, CubeSeries, CubeRun
 
 #-----------------------------------------------------------------------------------------
 #--------------------------------MAIN SCRIPT STARTS HERE----------------------------------
@@ -100,59 +23,23 @@ month_end	= 12	#12 = December, 13 = January (+ 1), 14 = February (+ 1), ...
 
 #-----------------------------------------------------------------------------------------
 	
-#Get the model names and path
-models = glob.glob(directory_CMIP6+'*')
-models.sort()
+#All the yearly series (CMIP6, HR-CESM, LR-CESM and AVISO) in a single read of the ensemble cube,
+#which is built first when not available, the CMIP6 models are in the order of the final plots
+cube		= EnsembleCube(month_start, month_end)
+models		= [cube['run'][run_i] for run_i in range(len(cube['run'])) if cube['group'][run_i] == 'CMIP6']
+time_year	= CubeRun(cube, models[0])[0]
 
-for model_i in range(len(models)):
-	#Only retain the model names
-	models[model_i]	= models[model_i][len(directory_CMIP6):]
+ssh_all_1, ssh_all_2, ssh_global_mean_all, ssh_global_all, ssh_global_control_all = [CubeSeries(cube, variable, models) for variable in ['SSH_region_1', 'SSH_region_2', 'SSH_global', 'SSH_global_steric', 'SSH_global_steric_control']]
 
-#Change the order for the final plots
-models.remove('CanESM5')
-models.insert(2, 'CanESM5')
+#Remove the global mean
+ssh_all_1                       = ssh_all_1 - ssh_global_mean_all
+ssh_all_2                       = ssh_all_2 - ssh_global_mean_all
 
-for model_i in range(len(models)):
-	#Get the model name for each file
-	file_ssh		        = directory_CMIP6+models[model_i]+'/Ocean/SSH_regions.nc'
-	file_ssh_global		        = directory_CMIP6+models[model_i]+'/Ocean/SSH_global.nc'
-	file_ssh_global_steric	        = directory_CMIP6+models[model_i]+'/Ocean/SSH_global_steric.nc'
-	file_ssh_global_steric_control  = directory_CMIP6+models[model_i]+'/Ocean/SSH_global_steric_Control.nc'
-
-
-	time, ssh_1, ssh_2		= ReadinData(file_ssh)
-	time, ssh_global		= ReadinDataGlobalMean(file_ssh_global)
-	time, ssh_global_steric		= ReadinDataGlobalSteric(file_ssh_global_steric)
-	time, ssh_global_steric_control	= ReadinDataGlobalSteric(file_ssh_global_steric_control)
-
-	#-----------------------------------------------------------------------------------------
-	time_year, ssh_year_1			   = YearlyConverter(time, ssh_1, month_start, month_end)
-	time_year, ssh_year_2			   = YearlyConverter(time, ssh_2, month_start, month_end)
-	time_year, ssh_global_year		   = YearlyConverter(time, ssh_global, month_start, month_end)
-	time_year, ssh_global_steric_year	   = YearlyConverter(time, ssh_global_steric, month_start, month_end)
-	time_year, ssh_global_steric_control_year  = YearlyConverter(time, ssh_global_steric_control, month_start, month_end)
-
-        #Remove the global mean
-        ssh_year_1                      = ssh_year_1 - ssh_global_year
-        ssh_year_2                      = ssh_year_2 - ssh_global_year
-
-	#Set first year to 0 and remove drift
-	ssh_year_1			= ssh_year_1 - ssh_year_1[0]
-	ssh_year_2			= ssh_year_2 - ssh_year_2[0]
-	ssh_global_steric_control_year	= ssh_global_steric_control_year - ssh_global_steric_control_year[0]
-	ssh_global_steric_year		= ssh_global_steric_year - ssh_global_steric_year[0] - ssh_global_steric_control_year
-
-	if model_i == 0:
-		#For the ensemble mean
-		ssh_all_1		= ma.masked_all((len(models), len(time_year)))
-		ssh_all_2		= ma.masked_all((len(models), len(time_year)))
-		ssh_global_all		= ma.masked_all((len(models), len(time_year)))
-		ssh_global_control_all	= ma.masked_all((len(models), len(time_year)))
-
-	ssh_all_1[model_i]		= ssh_year_1
-	ssh_all_2[model_i]		= ssh_year_2
-	ssh_global_all[model_i]	        = ssh_global_steric_year
-	ssh_global_control_all[model_i]	= ssh_global_steric_control_year
+#Set first year to 0 and remove drift
+ssh_all_1			= ssh_all_1 - ssh_all_1[:, :1]
+ssh_all_2			= ssh_all_2 - ssh_all_2[:, :1]
+ssh_global_control_all		= ssh_global_control_all - ssh_global_control_all[:, :1]
+ssh_global_all			= ssh_global_all - ssh_global_all[:, :1] - ssh_global_control_all
 
 #Get the sterodynamical sea level (DSL + steric)
 ssh_total_1		= ssh_all_1 + ssh_global_all
@@ -160,31 +47,24 @@ ssh_total_2		= ssh_all_2 + ssh_global_all
 
 #Now get the AVISO, HR-CESM and LR-CESM
 #-----------------------------------------------------------------------------------------
-time_aviso, ssh_1_aviso, ssh_2_aviso		= ReadinData(directory_aviso+'/Ocean/SSH_regions.nc')
-time_year_aviso, ssh_year_1_aviso		= YearlyConverter(time_aviso, ssh_1_aviso, month_start, month_end)
-time_year_aviso, ssh_year_2_aviso		= YearlyConverter(time_aviso, ssh_2_aviso, month_start, month_end)
+time_year_aviso, ssh_aviso			= CubeRun(cube, 'AVISO')
+ssh_year_1_aviso, ssh_year_2_aviso		= ssh_aviso['SSH_region_1'], ssh_aviso['SSH_region_2']
 
 trend_ssh_aviso_1, base_ssh_aviso_1		= polyfit(np.arange(len(time_year_aviso)), ssh_year_1_aviso, 1) * 10.0
 trend_ssh_aviso_2, base_ssh_aviso_2		= polyfit(np.arange(len(time_year_aviso)), ssh_year_2_aviso, 1) * 10.0
 #-----------------------------------------------------------------------------------------
-time_cesm, ssh_1_cesm, ssh_2_cesm		= ReadinData(directory_cesm+'/Ocean/SSH_regions.nc')
-time_year_cesm, ssh_year_1_cesm			= YearlyConverter(time_cesm, ssh_1_cesm, month_start, month_end)
-time_year_cesm, ssh_year_2_cesm			= YearlyConverter(time_cesm, ssh_2_cesm, month_start, month_end)
-
-time_cesm, ssh_global_cesm			= ReadinDataGlobalMean(directory_cesm+'Ocean/SSH_global.nc')
-time_year_cesm, ssh_global_year_cesm		= YearlyConverter(time_cesm, ssh_global_cesm, month_start, month_end)
+time_year_cesm, ssh_cesm			= CubeRun(cube, 'HR-CESM')
+ssh_year_1_cesm, ssh_year_2_cesm		= ssh_cesm['SSH_region_1'], ssh_cesm['SSH_region_2']
+ssh_global_year_cesm				= ssh_cesm['SSH_global']
 
 ssh_year_1_cesm					= ssh_year_1_cesm - ssh_global_year_cesm
 ssh_year_2_cesm					= ssh_year_2_cesm - ssh_global_year_cesm
 ssh_year_1_cesm					= ssh_year_1_cesm - ssh_year_1_cesm[0]
 ssh_year_2_cesm					= ssh_year_2_cesm - ssh_year_2_cesm[0]
 #-----------------------------------------------------------------------------------------	
-time_cesm_low, ssh_1_cesm_low, ssh_2_cesm_low	= ReadinData(directory_cesm_low+'/Ocean/SSH_regions.nc')
-time_year_cesm_low, ssh_year_1_cesm_low		= YearlyConverter(time_cesm_low, ssh_1_cesm_low, month_start, month_end)
-time_year_cesm_low, ssh_year_2_cesm_low		= YearlyConverter(time_cesm_low, ssh_2_cesm_low, month_start, month_end)
-
-time_cesm_low, ssh_global_cesm_low		= ReadinDataGlobalMean(directory_cesm_low+'Ocean/SSH_global.nc')
-time_year_cesm_low, ssh_global_year_cesm_low	= YearlyConverter(time_cesm_low, ssh_global_cesm_low, month_start, month_end)
+time_year_cesm_low, ssh_cesm_low		= CubeRun(cube, 'LR-CESM')
+ssh_year_1_cesm_low, ssh_year_2_cesm_low	= ssh_cesm_low['SSH_region_1'], ssh_cesm_low['SSH_region_2']
+ssh_global_year_cesm_low			= ssh_cesm_low['SSH_global']
 
 ssh_year_1_cesm_low				= ssh_year_1_cesm_low - ssh_global_year_cesm_low
 ssh_year_2_cesm_low				= ssh_year_2_cesm_low - ssh_global_year_cesm_low
@@ -194,20 +74,16 @@ ssh_year_2_cesm_low				= ssh_year_2_cesm_low - ssh_year_2_cesm_low[0]
 #Get the globally averaged steric sea level rise
 #-----------------------------------------------------------------------------------------
 
-time, ssh				                = ReadinDataGlobalSteric(directory_cesm+'Ocean/SSH_global_steric.nc')
-time_year_cesm, ssh_global_cesm_year	                = YearlyConverter(time, ssh, month_start, month_end)
+ssh_global_cesm_year			                = ssh_cesm['SSH_global_steric']
 ssh_global_cesm_year			                = ssh_global_cesm_year - ssh_global_cesm_year[0]
 #-----------------------------------------------------------------------------------------
-time, ssh_low				                = ReadinDataGlobalSteric(directory_cesm_low+'Ocean/SSH_global_steric.nc')
-time_year_low, ssh_global_cesm_low_year	                = YearlyConverter(time, ssh_low, month_start, month_end)
+ssh_global_cesm_low_year		                = ssh_cesm_low['SSH_global_steric']
 ssh_global_cesm_low_year		                = ssh_global_cesm_low_year - ssh_global_cesm_low_year[0]
 #-----------------------------------------------------------------------------------------
-time, ssh				                = ReadinDataGlobalSteric(directory_cesm_control+'Ocean/SSH_global_steric.nc')
-time_year_cesm_control, ssh_global_cesm_control_year	= YearlyConverter(time, ssh, month_start, month_end)
+ssh_global_cesm_control_year			        = ssh_cesm['SSH_global_steric_control']
 ssh_global_cesm_control_year			        = ssh_global_cesm_control_year - ssh_global_cesm_control_year[0]
 #-----------------------------------------------------------------------------------------
-time, ssh_low				                = ReadinDataGlobalSteric(directory_cesm_low_control+'Ocean/SSH_global_steric.nc')
-time_year_low, ssh_global_cesm_low_control_year	        = YearlyConverter(time, ssh_low, month_start, month_end)
+ssh_global_cesm_low_control_year		        = ssh_cesm_low['SSH_global_steric_control']
 ssh_global_cesm_low_control_year		        = ssh_global_cesm_low_control_year - ssh_global_cesm_low_control_year[0]
 #-----------------------------------------------------------------------------------------
 
@@ -4,12 +4,17 @@ from pylab import *
 import numpy
 import datetime
 import time
-import glob, os
+import glob, os, sys
 import math
 import netCDF4 as netcdf
 import matplotlib.colors as colors
 from mpl_toolkits.basemap import Basemap
 
+#Shared functions, relative to this directory
+sys.path.append('../../')
+from Functions.Data_access import ReadVariablesDomain
+from Functions.Product_registry import RequireProduct
+
 #Making pathway to folder with all data
 directory_CMIP6		= '../../../Data/CMIP6/'
 
@@ -38,14 +43,11 @@ for model_i in range(len(models)):
 for model_i in range(len(models)):
 	#Get for each model the file
 
-	HEAT_data 		= netcdf.Dataset(directory_CMIP6+models[model_i]+'/Ocean/SSH_sterodynamic_trend_year_'+str(year_start)+'-'+str(year_end)+'_month_'+str(month_start)+'-'+str(month_end)+'.nc', 'r')
-
-	lon			= HEAT_data.variables['lon'][:] 			
-	lat			= HEAT_data.variables['lat'][:] 			
-	SSH_trend		= HEAT_data.variables['SSH_trend'][:] 
-	SSH_trend_sig		= HEAT_data.variables['SSH_trend_sig'][:] 
+	#Get the file of the product, which is generated first when not available
+	filename		= RequireProduct('SSH_sterodynamic_trend', 'CMIP6/'+models[model_i], year_start = year_start, year_end = year_end, month_start = month_start, month_end = month_end)
 
-	HEAT_data.close()
+	#Only read the index rectangle enclosing the domain of the map (one extra grid point to close the contours)
+	lon, lat, SSH_trend, SSH_trend_sig	= ReadVariablesDomain(filename, ['lon', 'lat', 'SSH_trend', 'SSH_trend_sig'], 270, 330, -5, 25, margin = 1)
 
 	#Set all the non-significant trends to masked elements
 	SSH_trend_sig	      = ma.masked_where(SSH_trend_sig < (sig_level / 100.0), SSH_trend_sig)
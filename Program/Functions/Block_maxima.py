@@ -0,0 +1,164 @@
+#Functions for extracting the monthly and annual maxima of daily or sub-daily output,
+#the input file is streamed in chunks along the time axis
+
+import numpy as np
+import numpy.ma as ma
+import netCDF4 as netcdf
+
+from Functions.Data_access import CreateGrid, LayoutFilename
+from Functions.Yearly_converter import ordinal_epoch, YearOrdinal
+
+def BlockIndex(time, block = 'month'):
+	"""Returns the block index (months or years since 1970) of each time stamp (days since 0001-01-01)"""
+
+	days	= np.floor(np.asarray(time, dtype = float)).astype('int64') - ordinal_epoch
+
+	if block == 'month':
+		return days.astype('datetime64[D]').astype('datetime64[M]').astype('int64')
+
+	if block == 'year':
+		return days.astype('datetime64[D]').astype('datetime64[Y]').astype('int64')
+
+	raise ValueError('Unknown block: '+str(block))
+
+def BlockTime(block_index, block = 'month'):
+	"""Returns the time stamp of each block, the 15th of the month (as the monthly output) or 1 January"""
+
+	block_index	= np.asarray(block_index, dtype = 'int64')
+
+	if block == 'month':
+		return (block_index.astype('datetime64[M]').astype('datetime64[D]').astype('int64') + ordinal_epoch + 14).astype(float)
+
+	return YearOrdinal(block_index + 1970).astype(float)
+
+def ChunkMaxima(time, data, block_index):
+	"""Returns the block index, maximum and time of the maximum (first occurrence)
+	for each block in the chunk, the blocks are contiguous in time
+	The time stamps are either one per time index or one per value (same shape as the data)"""
+
+	block_start	= np.where(np.append(True, np.diff(block_index) != 0))[0]
+	block_id	= np.cumsum(np.append(True, np.diff(block_index) != 0)) - 1
+	data_max	= np.maximum.reduceat(data, block_start, axis = 0)
+
+	#First time index at which the maximum is attained, for each block and point
+	time_index	= np.arange(len(data)).reshape((len(data),) + (1,) * (data.ndim - 1))
+	time_index	= np.where(data == data_max[block_id], time_index, len(data))
+	time_index	= np.minimum.reduceat(time_index, block_start, axis = 0)
+	time		= np.asarray(time, dtype = float)
+
+	if time.ndim == 1:
+		time_max	= time[time_index]
+
+	else:
+		#Time stamps per point (the time of the monthly maxima)
+		time_max	= np.take_along_axis(time, time_index, axis = 0)
+
+	return block_index[block_start], data_max, time_max
+
+def BlockMaxima(filename, variable = 'SSH', chunk_bytes = 2**26):
+	"""Streams the (time, ...) variable of choice through chunks of about chunk_bytes (as float, the number of
+	time stamps follows from the size of one map) and returns the monthly and annual maxima and their time
+	of occurrence (days since 0001-01-01)
+	Only one chunk and the maxima are kept in memory, missing values are skipped
+	Returns a dictionary with month and year, each a tuple (time, maximum, time of maximum)"""
+
+	#The chunks of full maps, from the copy chunked for maps when available
+	fh 		= netcdf.Dataset(LayoutFilename(filename, 'map'), 'r')
+	time_var	= fh.variables['time']
+	data_var	= fh.variables[variable]
+	map_shape	= data_var.shape[1:]
+	chunk_size	= max(1, int(chunk_bytes // (8 * np.prod(map_shape))))
+
+	block_all, max_all, time_max_all	= [], [], []
+	carry		= None
+
+	for time_i in range(0, len(time_var), chunk_size):
+		time	= np.asarray(time_var[time_i:time_i + chunk_size], dtype = float)
+		data	= ma.filled(ma.masked_invalid(data_var[time_i:time_i + chunk_size]).astype(float), -np.inf)
+
+		block_index, data_max, time_max	= ChunkMaxima(time, data, BlockIndex(time, 'month'))
+
+		if carry is not None:
+			if carry[0] == block_index[0]:
+				#The first block continues the last block of the previous chunk, keep the earliest maximum
+				larger		= data_max[0] > carry[1]
+				data_max[0]	= np.where(larger, data_max[0], carry[1])
+				time_max[0]	= np.where(larger, time_max[0], carry[2])
+
+			else:
+				block_all.append(carry[0])
+				max_all.append(carry[1][None])
+				time_max_all.append(carry[2][None])
+
+		#All blocks but the last are complete
+		block_all.append(block_index[:-1])
+		max_all.append(data_max[:-1])
+		time_max_all.append(time_max[:-1])
+
+		carry	= (block_index[-1:], data_max[-1], time_max[-1])
+
+	fh.close()
+
+	if carry is None:
+		#No time stamps, no blocks
+		empty	= ma.masked_all((0,) + map_shape)
+
+		return {'month': (np.zeros(0), empty, empty.copy()), 'year': (np.zeros(0), empty.copy(), empty.copy())}
+
+	block_all.append(carry[0])
+	max_all.append(carry[1][None])
+	time_max_all.append(carry[2][None])
+
+	block_month	= np.concatenate(block_all)
+	max_month	= np.concatenate(max_all)
+	time_max_month	= np.concatenate(time_max_all)
+
+	#Annual maxima from the monthly maxima, the years are contiguous as well
+	block_year, max_year, time_max_year	= ChunkMaxima(time_max_month, max_month, BlockIndex(BlockTime(block_month), 'year'))
+
+	maxima	= {}
+
+	for block, block_index, data_max, time_max in [['month', block_month, max_month, time_max_month], ['year', block_year, max_year, time_max_year]]:
+		#Blocks without any valid value
+		data_max	= ma.masked_where(np.isneginf(data_max), data_max)
+		time_max	= ma.masked_array(time_max, mask = ma.getmaskarray(data_max))
+
+		maxima[block]	= (BlockTime(block_index, block), data_max, time_max)
+
+	return maxima
+
+def WriteBlockMaxima(filename, time, data, time_max, variable = 'SSH', units = 'cm', filename_grid = None):
+	"""Writes the block maxima in the format of the monthly maximum output, (time, variable) for a time series
+	or (time, y, x) for a field, together with the time of the maximum
+	For a field, the dimensions and the grid (lon and lat) are copied from the variable in filename_grid"""
+
+	fh 		= netcdf.Dataset(filename, 'w')
+
+	fh.createDimension('time', len(time))
+
+	if np.ndim(data) > 1:
+		if filename_grid is None:
+			raise ValueError('The grid file is required for the block maxima of a field')
+
+		fh_grid		= netcdf.Dataset(filename_grid, 'r')
+		dimensions	= fh_grid.variables[variable].dimensions[1:]
+
+		CreateGrid(fh_grid, fh, dimensions)
+		fh_grid.close()
+
+	else:
+		dimensions	= ()
+
+	time_out	= fh.createVariable('time', float, ('time',))
+	data_out	= fh.createVariable(variable, float, ('time',) + dimensions, fill_value = 1.0e20)
+	time_max_out	= fh.createVariable('time_maximum', float, ('time',) + dimensions, fill_value = 1.0e20)
+
+	time_out.units		= 'Days since 0001-01-01 00:00:00 UTC'
+	data_out.units		= units
+	time_max_out.units	= 'Days since 0001-01-01 00:00:00 UTC'
+
+	time_out[:]		= time
+	data_out[:]		= data
+	time_max_out[:]		= time_max
+
+	fh.close()
@@ -0,0 +1,118 @@
+#Functions for loading the (derived) series of all the CMIP6 models,
+#the files are read and converted serially or (optionally) on a pool of processes
+
+import glob
+import os
+import multiprocessing
+from functools import partial
+import numpy.ma as ma
+
+from Functions.Data_access import ReadVariables
+from Functions.Series_cache import CacheFilename, LoadCache, SaveCache
+from Functions.Yearly_converter import YearlyConverterBatch
+
+def ModelNames(directory_CMIP6, insert = []):
+	"""Returns the sorted model names (directories), the (model, index) pairs in insert
+	are moved to the given index, e.g. [('CanESM5', 2)] for the final plots"""
+
+	models	= sorted(glob.glob(directory_CMIP6+'*'))
+
+	#Only retain the model names
+	models	= [model[len(directory_CMIP6):] for model in models]
+
+	for model, model_index in insert:
+		if model in models:
+			models.remove(model)
+			models.insert(model_index, model)
+
+	return models
+
+def LoadModel(arguments):
+	"""Returns the cached result of a model or reads (read_function(files)) and converts
+	(convert_function(data, *parameters)) its data, together with whether the result was cached"""
+
+	files, filename_cache, read_function, convert_function, parameters	= arguments
+
+	result	= LoadCache(filename_cache) if filename_cache is not None else None
+
+	if result is not None:
+		return True, result
+
+	return False, list(convert_function(read_function(files), *parameters))
+
+def LoadModels(files_all, read_function, convert_function, parameters = [], step = None, cache_parameters = None, processes = 1):
+	"""Loads all the models (one list of files each), each model is read (read_function(files)) and converted
+	(convert_function(data, *parameters), a list of arrays) on a pool of processes (default 1 is serial, None uses all cores),
+	so the reads of the models overlap, each process has its own netCDF library and data-access caches
+	With a step name the results are taken from (and stored in) the cache of derived series,
+	keyed by the cache_parameters (default the parameters of the conversion)
+	A pool (not available for unguarded module-level code with the spawn start method) is only started
+	when some results are not in the cache
+	Returns the list of results in the order of files_all, independent of the number of processes"""
+
+	cache_parameters	= parameters if cache_parameters is None else cache_parameters
+	filenames_cache		= [CacheFilename(step, files, cache_parameters) if step is not None else None for files in files_all]
+	arguments		= [(files_all[model_i], filenames_cache[model_i], read_function, convert_function, parameters) for model_i in range(len(files_all))]
+
+	cached_all		= all([filename_cache is not None and os.path.exists(filename_cache) for filename_cache in filenames_cache])
+
+	if processes == 1 or len(arguments) <= 1 or cached_all:
+		load_all	= [LoadModel(argument) for argument in arguments]
+
+	else:
+		pool		= multiprocessing.Pool(processes)
+
+		try:
+			#The map keeps the order of the models
+			load_all	= pool.map(LoadModel, arguments)
+
+		finally:
+			pool.close()
+			pool.join()
+
+	results		= []
+
+	for model_i, (cached, result) in enumerate(load_all):
+		if step is not None and not cached:
+			SaveCache(filenames_cache[model_i], result)
+
+		results.append(result)
+
+	return results
+
+def ReadinDataYearly(files, variables):
+	"""Reads-in the time and the variables of choice (one file)"""
+
+	return ReadVariables(files[0], ['time'] + list(variables))
+
+def ConvertDataYearly(data, month_start = 1, month_end = 12):
+	"""Returns the yearly time and the yearly averages of each variable"""
+
+	time_year, data_year	= YearlyConverterBatch(data[0], data[1:], month_start, month_end)
+
+	return [time_year] + list(data_year)
+
+def YearlyModels(filenames, variables, month_start = 1, month_end = 12, processes = 1):
+	"""Returns the yearly averages of the variables of choice for each file (model), the cache of derived
+	series is shared with YearlySeries, see LoadModels"""
+
+	return LoadModels([[filename] for filename in filenames], partial(ReadinDataYearly, variables = variables), ConvertDataYearly, [month_start, month_end],
+				'yearly', [list(variables), month_start, month_end], processes)
+
+def EnsembleArrays(results):
+	"""Returns the time (of the longest model) and the (model, time) ensemble array of each series,
+	from the results of LoadModels (time, series 1, series 2, ...), shorter models are masked at the end"""
+
+	number_time	= max([len(result[0]) for result in results])
+	time		= [result[0] for result in results if len(result[0]) == number_time][0]
+	ensemble	= []
+
+	for series_i in range(1, len(results[0])):
+		series_all	= ma.masked_all((len(results), number_time))
+
+		for model_i in range(len(results)):
+			series_all[model_i, :len(results[model_i][series_i])]	= results[model_i][series_i]
+
+		ensemble.append(series_all)
+
+	return time, ensemble
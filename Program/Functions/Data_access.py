@@ -0,0 +1,214 @@
+#Functions for reading the (processed) model output, the open datasets and the variables
+#which are already read are kept in bounded LRU caches and shared by all the readers
+
+import atexit
+import os
+import threading
+from collections import OrderedDict
+import numpy as np
+import netCDF4 as netcdf
+
+#Maximum number of open datasets, of variables and of domain index bounds kept in memory
+dataset_cache_size	= 16
+variable_cache_size	= 64
+domain_cache_size	= 64
+
+#Maximum number of bytes of all the variables in memory, larger variables are read but not kept
+variable_cache_bytes	= 2**30
+
+dataset_cache		= OrderedDict()
+variable_cache		= OrderedDict()
+domain_cache		= OrderedDict()
+
+#The caches (and the netCDF library) are shared by all threads
+data_lock		= threading.RLock()
+
+def CacheKey(filename):
+	"""Returns the absolute path and modification time, a rewritten file gets a new key"""
+
+	filename	= os.path.abspath(filename)
+
+	return filename, os.path.getmtime(filename)
+
+def OpenDataset(filename):
+	"""Returns the (read-only) dataset, the least recently used dataset is closed when the cache is full"""
+
+	with data_lock:
+		key	= CacheKey(filename)
+
+		if key in dataset_cache:
+			#Move to the most recently used position
+			dataset			= dataset_cache.pop(key)
+			dataset_cache[key]	= dataset
+
+			return dataset
+
+		dataset			= netcdf.Dataset(key[0], 'r')
+		dataset_cache[key]	= dataset
+
+		while len(dataset_cache) > dataset_cache_size:
+			dataset_cache.popitem(last = False)[1].close()
+
+		return dataset
+
+def ReadVariable(filename, variable):
+	"""Returns the full variable, each (file, variable) is only read once while in the cache
+	A copy is returned, so the cached values are never changed by the caller"""
+
+	with data_lock:
+		key	= CacheKey(filename) + (variable,)
+
+		if key in variable_cache:
+			data			= variable_cache.pop(key)
+			variable_cache[key]	= data
+
+			return data.copy()
+
+		data			= OpenDataset(filename).variables[variable][:]
+
+		if data.nbytes > variable_cache_bytes:
+			#Too large for the cache, the caller gets the only copy
+			return data
+
+		variable_cache[key]	= data
+
+		while len(variable_cache) > variable_cache_size or sum([data_cache.nbytes for data_cache in variable_cache.values()]) > variable_cache_bytes:
+			variable_cache.popitem(last = False)
+
+		return data.copy()
+
+def ReadVariables(filename, variables):
+	"""Returns the full variables of choice from the same file"""
+
+	return [ReadVariable(filename, variable) for variable in variables]
+
+def CloseDatasets():
+	"""Closes all the open datasets and empties the caches"""
+
+	with data_lock:
+		while len(dataset_cache) > 0:
+			dataset_cache.popitem()[1].close()
+
+		variable_cache.clear()
+		domain_cache.clear()
+
+atexit.register(CloseDatasets)
+
+def DomainIndices(lon, lat, lon_min = 270, lon_max = 330, lat_min = -5, lat_max = 25):
+	"""Returns the (y, x) slices of the smallest index rectangle enclosing all grid points
+	within the domain, for a regular (1-D) or curvilinear (2-D) grid"""
+
+	lon		= np.asarray(lon) % 360
+	lat		= np.asarray(lat)
+
+	if lon.ndim == 1:
+		index_y	= np.where((lat >= lat_min) & (lat <= lat_max))[0]
+		index_x	= np.where((lon >= lon_min) & (lon <= lon_max))[0]
+
+	else:
+		domain	= (lon >= lon_min) & (lon <= lon_max) & (lat >= lat_min) & (lat <= lat_max)
+		index_y	= np.where(np.any(domain, axis = 1))[0]
+		index_x	= np.where(np.any(domain, axis = 0))[0]
+
+	if len(index_y) == 0 or len(index_x) == 0:
+		raise ValueError('No grid points within the domain: lon '+str(lon_min)+' - '+str(lon_max)+', lat '+str(lat_min)+' - '+str(lat_max))
+
+	return slice(index_y[0], index_y[-1] + 1), slice(index_x[0], index_x[-1] + 1)
+
+def GridDomain(filename, lon_min = 270, lon_max = 330, lat_min = -5, lat_max = 25, margin = 0):
+	"""Returns the index bounds of the domain on the grid (lon, lat) of the file, a dictionary with the slice
+	of the y and x dimensions, extended by margin grid points on each side (e.g. to close the contours at the edges)
+	The bounds are determined once for each grid (file) and domain"""
+
+	with data_lock:
+		key	= CacheKey(filename) + (lon_min, lon_max, lat_min, lat_max, margin)
+
+		if key in domain_cache:
+			domain			= domain_cache.pop(key)
+			domain_cache[key]	= domain
+
+			return domain
+
+		fh			= OpenDataset(filename)
+		lon_var, lat_var	= fh.variables['lon'], fh.variables['lat']
+		slice_y, slice_x	= DomainIndices(lon_var[:], lat_var[:], lon_min, lon_max, lat_min, lat_max)
+
+		#The y and x dimensions of the regular (1-D) or curvilinear (2-D) grid
+		dim_y, dim_x		= (lat_var.dimensions[0], lon_var.dimensions[0]) if lon_var.ndim == 1 else lon_var.dimensions
+		number_y, number_x	= len(fh.dimensions[dim_y]), len(fh.dimensions[dim_x])
+
+		domain			= {dim_y: slice(max(slice_y.start - margin, 0), min(slice_y.stop + margin, number_y)),
+					   dim_x: slice(max(slice_x.start - margin, 0), min(slice_x.stop + margin, number_x))}
+		domain_cache[key]	= domain
+
+		while len(domain_cache) > domain_cache_size:
+			domain_cache.popitem(last = False)
+
+		return domain
+
+def ReadVariablesDomain(filename, variables, lon_min = 270, lon_max = 330, lat_min = -5, lat_max = 25, margin = 0):
+	"""Returns the variables of choice (including lon and lat) from the same file, only the hyperslab
+	of the index rectangle enclosing the domain is read, see GridDomain"""
+
+	domain	= GridDomain(filename, lon_min, lon_max, lat_min, lat_max, margin)
+	data	= []
+
+	with data_lock:
+		fh	= OpenDataset(filename)
+
+		for variable in variables:
+			var	= fh.variables[variable]
+			data.append(var[tuple([domain.get(dim, slice(None)) for dim in var.dimensions])])
+
+	return data
+
+def CreateGrid(fh_in, fh_out, dimensions):
+	"""Copies the dimensions and the grid (1-D or curvilinear lon and lat) to the output file"""
+
+	for dim in dimensions:
+		fh_out.createDimension(dim, len(fh_in.dimensions[dim]))
+
+	for coord in ['lat', 'lon']:
+		coord_in	= fh_in.variables[coord]
+		coord_out	= fh_out.createVariable(coord, float, coord_in.dimensions)
+		coord_out[:]	= coord_in[:]
+
+		for attr in coord_in.ncattrs():
+			coord_out.setncattr(attr, coord_in.getncattr(attr))
+
+def LayoutName(filename, pattern):
+	"""Returns the name of the copy of a file with the chunking of the access pattern, e.g. SSH_chunks_series.nc"""
+
+	filename_stem, extension	= os.path.splitext(filename)
+
+	for pattern_copy in ['series', 'map']:
+		if filename_stem.endswith('_chunks_'+pattern_copy):
+			#Already a copy, same name for all the layouts
+			filename_stem	= filename_stem[:-len('_chunks_'+pattern_copy)]
+
+	return filename_stem+'_chunks_'+pattern+extension
+
+def LayoutFilename(filename, pattern):
+	"""Returns the copy of the file with the chunking of the access pattern of choice, 'series' (full time series
+	at a few points) or 'map' (full maps at one time), when available and up to date, otherwise the file itself"""
+
+	filename_layout	= LayoutName(filename, pattern)
+
+	if os.path.exists(filename_layout) and os.path.getmtime(filename_layout) >= os.path.getmtime(filename):
+		return filename_layout
+
+	return filename
+
+def ReadinDataGlobalMean(filename):
+	"""Reads-in the global mean sea surface height (cm)"""
+
+	time, ssh_global	= ReadVariables(filename, ['time', 'SSH_global'])
+
+	return time, ssh_global
+
+def ReadinDataGlobalSteric(filename):
+	"""Reads-in the global steric sea level (cm)"""
+
+	time, ssh		= ReadVariables(filename, ['time', 'SSH'])
+
+	return time, ssh * 100.0
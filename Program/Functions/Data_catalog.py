@@ -0,0 +1,247 @@
+#Functions for a catalog of all the (processed) products in the Data directory, the run, model, parameters,
+#dimensions, time range and grid of each file are stored in an index which is queried without opening the files
+
+import json
+import os
+import re
+import netCDF4 as netcdf
+
+#Data directory and the catalog (index) file, relative to this directory
+data_directory		= os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'Data')
+catalog_filename	= os.path.join(data_directory, 'Cache', 'Catalog.json')
+
+#Increase when the entries change, the catalog is then determined again
+catalog_version		= 3
+
+#The parameters which are encoded in the file names, e.g. UV_trend_depth_0-100_m_year_1-101_month_1-12.nc
+parameter_patterns	= [['depth_min', 'depth_max', re.compile(r'_depth_(\d+)-(\d+)_m')], ['year_start', 'year_end', re.compile(r'_year_(\d+)-(\d+)')],
+			   ['month_start', 'month_end', re.compile(r'_month_(\d+)-(\d+)')]]
+
+#The copies of a product with the chunking of an access pattern, e.g. SSH_chunks_series.nc (see Rechunk)
+layout_pattern		= re.compile(r'_chunks_(series|map)$')
+
+#The fields which are indexed for the queries
+index_fields		= ['run', 'model', 'realm', 'product', 'control', 'layout', 'grid', 'depth_min', 'depth_max', 'year_start', 'year_end', 'month_start', 'month_end']
+
+def ProductName(filename):
+	"""Returns the product name and the parameters (depth, year and month ranges and the chunking layout) from the file name"""
+
+	name		= os.path.splitext(os.path.basename(filename))[0]
+	parameters	= {'layout': None}
+
+	match		= layout_pattern.search(name)
+
+	if match is not None:
+		parameters['layout']	= match.group(1)
+		name			= name[:match.start()]
+
+	for parameter_start, parameter_end, pattern in parameter_patterns:
+		match	= pattern.search(name)
+
+		if match is None:
+			parameters[parameter_start], parameters[parameter_end]	= None, None
+			continue
+
+		parameters[parameter_start], parameters[parameter_end]	= int(match.group(1)), int(match.group(2))
+		name	= name.replace(match.group(0), '')
+
+	return name, parameters
+
+def GridType(fh):
+	"""Returns the grid of the dataset, curvilinear (2-D lon/lat), regular (1-D lon/lat) or None (series)"""
+
+	if 'lon' not in fh.variables:
+		return None
+
+	lon_var	= fh.variables['lon']
+
+	if lon_var.ndim == 2:
+		return 'curvilinear'
+
+	if lon_var.dimensions == ('lon',):
+		return 'regular'
+
+	#E.g. the location of the maximum for each time
+	return None
+
+def DescribeFile(path, directory = data_directory):
+	"""Returns the catalog entry of a file (path relative to the data directory)"""
+
+	filename	= os.path.join(directory, path)
+	parts		= path.replace(os.sep, '/').split('/')
+
+	#E.g. HR-CESM/Ocean/..., HR-CESM_Control/Ocean/... or CMIP6/CanESM5/Ocean/...
+	run		= parts[0]
+	model		= parts[1] if run == 'CMIP6' else run.replace('_Control', '')
+	product, parameters	= ProductName(path)
+	control		= run.endswith('_Control') or product.endswith('_Control')
+
+	entry		= {'path': path, 'run': run, 'model': model, 'realm': parts[-2], 'product': product.replace('_Control', ''), 'control': control,
+			   'mtime': os.path.getmtime(filename), 'size': os.path.getsize(filename)}
+	entry.update(parameters)
+
+	fh		= netcdf.Dataset(filename, 'r')
+
+	try:
+		entry['dimensions']	= dict([(dim, len(fh.dimensions[dim])) for dim in fh.dimensions])
+		entry['variables']	= dict([(var, list(fh.variables[var].dimensions)) for var in fh.variables if var not in fh.dimensions])
+		entry['grid']		= GridType(fh)
+		entry['time_start']	= None
+		entry['time_end']	= None
+
+		if 'time' in fh.variables and len(fh.variables['time']) > 0:
+			#Days since 0001-01-01
+			entry['time_start']	= float(fh.variables['time'][0])
+			entry['time_end']	= float(fh.variables['time'][-1])
+
+	finally:
+		fh.close()
+
+	return entry
+
+def WalkData(directory = data_directory):
+	"""Walks the data directory (sorted), without the directory of the cached (derived) results"""
+
+	for root, dirs, files in os.walk(directory):
+		dirs[:]	= sorted([directory_sub for directory_sub in dirs if not (root == directory and directory_sub == 'Cache')])
+
+		yield root, dirs, files
+
+def DirectoryTimes(directory = data_directory):
+	"""Returns the modification time of each (sub)directory of the data directory, which changes
+	when a file or directory (e.g. a model) is added, removed or renamed in it"""
+
+	return dict([(os.path.relpath(root, directory), os.path.getmtime(root)) for root, dirs, files in WalkData(directory)])
+
+def ScanCatalog(catalog = None, directory = data_directory):
+	"""Scans the data directory for all the products, only the new or changed files are opened
+	Returns the catalog, a dictionary with the entry of each path and the modification time of each directory"""
+
+	entries_old	= {} if catalog is None else catalog['entries']
+	entries		= {}
+	directories	= DirectoryTimes(directory)
+
+	for root, dirs, files in WalkData(directory):
+		for filename in sorted(files):
+			if not filename.endswith('.nc'):
+				continue
+
+			path	= os.path.relpath(os.path.join(root, filename), directory)
+			entry	= entries_old.get(path)
+
+			if entry is None or entry['mtime'] != os.path.getmtime(os.path.join(root, filename)) or entry['size'] != os.path.getsize(os.path.join(root, filename)):
+				entry	= DescribeFile(path, directory)
+
+			entries[path]	= entry
+
+	return {'version': catalog_version, 'entries': entries, 'directories': directories}
+
+def SaveCatalog(catalog, filename = catalog_filename):
+	"""Writes the catalog to the index file"""
+
+	directory	= os.path.dirname(filename)
+
+	if not os.path.exists(directory):
+		try:
+			os.makedirs(directory)
+
+		except OSError:
+			#Created by another process in the meantime
+			pass
+
+	#Write to a temporary file first, so the index is always complete
+	filename_temp	= filename+'_'+str(os.getpid())+'.tmp'
+	fh		= open(filename_temp, 'w')
+
+	try:
+		json.dump(catalog, fh, sort_keys = True)
+
+	finally:
+		fh.close()
+
+	os.rename(filename_temp, filename)
+
+def LoadCatalog(update = False, filename = catalog_filename, directory = data_directory):
+	"""Returns the catalog from the index file, which is determined (and stored) when not yet available
+	The data directory is scanned again when files or directories are added or removed (directory modification times)
+	With update = True, the data directory is always scanned for new, changed or removed files"""
+
+	catalog	= None
+
+	if os.path.exists(filename):
+		try:
+			fh	= open(filename, 'r')
+
+			try:
+				catalog	= json.load(fh)
+
+			finally:
+				fh.close()
+
+			if catalog.get('version') != catalog_version:
+				catalog	= None
+
+		except ValueError:
+			#Incomplete or corrupt index, determine again
+			catalog	= None
+
+	if catalog is not None and catalog.get('directories') != DirectoryTimes(directory):
+		#Files or directories added or removed since the index was stored
+		update	= True
+
+	if catalog is None or update:
+		catalog_new	= ScanCatalog(catalog, directory)
+
+		if catalog is None or catalog_new != catalog:
+			SaveCatalog(catalog_new, filename)
+
+		catalog	= catalog_new
+
+	catalog['index']	= CatalogIndex(catalog)
+
+	return catalog
+
+def CatalogIndex(catalog):
+	"""Returns the index of the catalog, for each field and value the set of paths"""
+
+	index	= dict([(field, {}) for field in index_fields])
+
+	for path in catalog['entries']:
+		entry	= catalog['entries'][path]
+
+		for field in index_fields:
+			index[field].setdefault(entry[field], set()).add(path)
+
+	return index
+
+def FindProducts(catalog, **criteria):
+	"""Returns the entries (sorted by directory and file name, as the model names) which match all the criteria, e.g. run = 'CMIP6', product = 'AMOC_transport'
+	Only the indexed fields are used (run, model, realm, product, control, layout, grid and the depth, year and month ranges),
+	the rechunked copies of the products have a layout, use layout = None for the products only"""
+
+	if 'index' not in catalog:
+		catalog['index']	= CatalogIndex(catalog)
+
+	paths	= None
+
+	#Start from the smallest set of paths
+	for field in sorted(criteria, key = lambda field: len(catalog['index'][field].get(criteria[field], ()))):
+		paths_field	= catalog['index'][field].get(criteria[field], set())
+		paths		= set(paths_field) if paths is None else paths & paths_field
+
+		if len(paths) == 0:
+			break
+
+	paths	= catalog['entries'].keys() if paths is None else paths
+
+	return [catalog['entries'][path] for path in sorted(paths, key = lambda path: path.replace(os.sep, '/').split('/'))]
+
+def ProductFilename(entry, directory = data_directory):
+	"""Returns the file name of a catalog entry"""
+
+	return os.path.join(directory, entry['path'])
+
+def CatalogModels(catalog, run = 'CMIP6', **criteria):
+	"""Returns the sorted (unique) models of the run of choice, optionally only those with the products of choice"""
+
+	return sorted(set([entry['model'] for entry in FindProducts(catalog, run = run, **criteria)]))
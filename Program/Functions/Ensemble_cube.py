@@ -0,0 +1,212 @@
+#Functions for the ensemble cube, a single (compressed) netCDF file with the yearly-averaged sea-level series
+#of all the runs (CMIP6 models, HR-CESM, LR-CESM and AVISO) in a (run, variable, year) layout
+
+import json
+import os
+import numpy.ma as ma
+import netCDF4 as netcdf
+
+from Functions.Data_access import ReadVariables
+from Functions.Series_cache import cache_directory, FileSignature
+from Functions.Data_catalog import data_directory
+from Functions.CMIP6_loader import ModelNames, LoadModels
+from Functions.Yearly_converter import YearlyConverterBatch
+
+#The variables of the cube: name, variable in the file and the scale factor (m to cm for the steric sea level)
+cube_variables	= [['SSH_region_1', 'SSH_region_1', 1.0], ['SSH_region_2', 'SSH_region_2', 1.0], ['SSH_global', 'SSH_global', 1.0],
+		   ['SSH_global_steric', 'SSH', 100.0], ['SSH_global_steric_control', 'SSH', 100.0]]
+
+def EnsembleRuns(directory = data_directory):
+	"""Returns the runs of the cube, each a list of the run name, group and the file of each cube variable (None if not available)
+	The CMIP6 models come first (CanESM5 at index 2 for the final plots), followed by HR-CESM, LR-CESM and AVISO"""
+
+	runs	= []
+
+	for model in ModelNames(os.path.join(directory, 'CMIP6', ''), [('CanESM5', 2)]):
+		directory_model	= os.path.join(directory, 'CMIP6', model, 'Ocean')
+		files		= ['SSH_regions.nc', 'SSH_regions.nc', 'SSH_global.nc', 'SSH_global_steric.nc', 'SSH_global_steric_Control.nc']
+
+		runs.append([model, 'CMIP6', [os.path.join(directory_model, filename) for filename in files]])
+
+	for run in ['HR-CESM', 'LR-CESM']:
+		directory_run	= os.path.join(directory, run, 'Ocean')
+		files		= [os.path.join(directory_run, filename) for filename in ['SSH_regions.nc', 'SSH_regions.nc', 'SSH_global.nc', 'SSH_global_steric.nc']]
+
+		#The steric sea level of the control simulation (drift)
+		runs.append([run, 'CESM', files + [os.path.join(directory, run+'_Control', 'Ocean', 'SSH_global_steric.nc')]])
+
+	regions	= os.path.join(directory, 'AVISO', 'Ocean', 'SSH_regions.nc')
+	runs.append(['AVISO', 'Observations', [regions, regions, None, None, None]])
+
+	#Only the available files
+	for run in runs:
+		run[2]	= [filename if filename is not None and os.path.exists(filename) else None for filename in run[2]]
+
+	return runs
+
+def ReadinDataRun(files):
+	"""Reads-in the time and the (scaled) cube variables of a run, None if not available"""
+
+	data	= [None] * len(cube_variables)
+
+	for variable_i in range(len(files)):
+		if files[variable_i] is None:
+			continue
+
+		time_file, data_file	= ReadVariables(files[variable_i], ['time', cube_variables[variable_i][1]])
+		data[variable_i]	= (time_file, data_file * cube_variables[variable_i][2])
+
+	return data
+
+def ConvertDataRun(data, month_start = 1, month_end = 12):
+	"""Returns the yearly time axis (of the first available series) and the yearly averages of the cube variables
+	of a run (fully masked if not available), the series are aligned by their year index
+	All series with as many time stamps as the first one are converted in one pass on its time axis
+	(as the control simulations have a different calendar)"""
+
+	time		= [data_variable[0] for data_variable in data if data_variable is not None][0]
+	data_year	= [None] * len(cube_variables)
+	batch_index	= []
+
+	for variable_i in range(len(data)):
+		if data[variable_i] is None:
+			continue
+
+		if len(data[variable_i][0]) == len(time):
+			batch_index.append(variable_i)
+
+		else:
+			#Different length, convert on its own time axis
+			data_year[variable_i]	= YearlyConverterBatch(data[variable_i][0], [data[variable_i][1]], month_start, month_end)[1][0]
+
+	time_year, data_batch	= YearlyConverterBatch(time, [data[variable_i][1] for variable_i in batch_index], month_start, month_end)
+
+	for index_i, variable_i in enumerate(batch_index):
+		data_year[variable_i]	= data_batch[index_i]
+
+	#The missing variables as masked series, so all results can be cached
+	data_year	= [ma.masked_all(len(time_year)) if data_variable is None else data_variable for data_variable in data_year]
+
+	return [time_year] + data_year
+
+def CubeSources(runs):
+	"""Returns the description of the runs and the signature (see FileSignature) of each source file,
+	the cube is only valid for the same description"""
+
+	sources	= [[run[0], run[1], [FileSignature(filename) if filename is not None else None for filename in run[2]]] for run in runs]
+
+	return json.dumps(sources, sort_keys = True)
+
+def BuildEnsembleCube(filename, month_start = 1, month_end = 12, directory = data_directory, processes = 1):
+	"""Writes the ensemble cube, the yearly averages (months of choice) of all the runs and cube variables (run, variable, year),
+	as a single compressed chunk, together with the yearly time (run, year), the run metadata (name and group) and the sources
+	The runs are read and converted through the cache of derived series, serially or (processes) on a pool, see LoadModels"""
+
+	runs		= EnsembleRuns(directory)
+	results		= LoadModels([run[2] for run in runs], ReadinDataRun, ConvertDataRun, [month_start, month_end], 'cube_run', None, processes)
+	number_years	= max([len(result[0]) for result in results])
+
+	time_all	= ma.masked_all((len(runs), number_years))
+	data_all	= ma.masked_all((len(runs), len(cube_variables), number_years))
+
+	for run_i in range(len(runs)):
+		time_year, data_year	= results[run_i][0], results[run_i][1:]
+		time_all[run_i, :len(time_year)]	= time_year
+
+		for variable_i in range(len(cube_variables)):
+			data_all[run_i, variable_i, :len(data_year[variable_i])]	= data_year[variable_i]
+
+	#-----------------------------------------------------------------------------------------
+	#Write to a temporary file first, so the cube is always complete
+	filename_temp	= filename+'_'+str(os.getpid())+'.tmp'
+	fh		= netcdf.Dataset(filename_temp, 'w')
+
+	fh.createDimension('run', len(runs))
+	fh.createDimension('variable', len(cube_variables))
+	fh.createDimension('year', number_years)
+
+	run_out		= fh.createVariable('run', str, ('run',))
+	group_out	= fh.createVariable('group', str, ('run',))
+	variable_out	= fh.createVariable('variable', str, ('variable',))
+	number_out	= fh.createVariable('number_years', 'i4', ('run',))
+	time_out	= fh.createVariable('time', float, ('run', 'year'), fill_value = 1.0e20)
+	data_out	= fh.createVariable('SSH', float, ('run', 'variable', 'year'), zlib = True, chunksizes = (len(runs), len(cube_variables), number_years), fill_value = 1.0e20)
+
+	fh.month_start		= month_start
+	fh.month_end		= month_end
+	fh.sources		= CubeSources(runs)
+	time_out.units		= 'Days since 0001-01-01 00:00:00 UTC'
+	data_out.units		= 'cm'
+	data_out.long_name	= 'Yearly-averaged sea level, see variable for the series'
+
+	for run_i in range(len(runs)):
+		run_out[run_i]		= runs[run_i][0]
+		group_out[run_i]	= runs[run_i][1]
+		number_out[run_i]	= len(results[run_i][0])
+
+	for variable_i in range(len(cube_variables)):
+		variable_out[variable_i]	= cube_variables[variable_i][0]
+
+	time_out[:]	= time_all
+	data_out[:]	= data_all
+
+	fh.close()
+
+	os.rename(filename_temp, filename)
+
+def CubeValid(filename, runs):
+	"""Returns whether the cube is available and built from the same runs and source files"""
+
+	if not os.path.exists(filename):
+		return False
+
+	fh	= netcdf.Dataset(filename, 'r')
+
+	try:
+		return 'sources' in fh.ncattrs() and fh.sources == CubeSources(runs)
+
+	finally:
+		fh.close()
+
+def ReadEnsembleCube(filename):
+	"""Reads-in the ensemble cube, returns a dictionary with the run names, groups, variables, number of years,
+	the yearly time (run, year) and the yearly averages (run, variable, year)"""
+
+	run, group, variable, number_years, time, ssh	= ReadVariables(filename, ['run', 'group', 'variable', 'number_years', 'time', 'SSH'])
+
+	return {'run': [str(name) for name in run], 'group': [str(name) for name in group], 'variable': [str(name) for name in variable],
+		'number_years': number_years, 'time': time, 'SSH': ssh}
+
+def EnsembleCube(month_start = 1, month_end = 12, filename = None, directory = data_directory, processes = 1):
+	"""Returns the ensemble cube (see ReadEnsembleCube) for the months of choice, the cube is built first
+	when not available or when the runs or any of their source files (path, modification time and size) changed"""
+
+	if filename is None:
+		filename	= os.path.join(cache_directory, 'Ensemble_cube_month_'+str(month_start)+'-'+str(month_end)+'.nc')
+
+	if not CubeValid(filename, EnsembleRuns(directory)):
+		if not os.path.exists(os.path.dirname(filename)):
+			try:
+				os.makedirs(os.path.dirname(filename))
+
+			except OSError:
+				#Created by another process in the meantime
+				pass
+
+		BuildEnsembleCube(filename, month_start, month_end, directory, processes)
+
+	return ReadEnsembleCube(filename)
+
+def CubeSeries(cube, variable, runs):
+	"""Returns the (run, year) array of the variable for the runs of choice (in the given order)"""
+
+	return cube['SSH'][[cube['run'].index(run) for run in runs], cube['variable'].index(variable)]
+
+def CubeRun(cube, run):
+	"""Returns the yearly time and a dictionary with the series of each variable of a run, only the years of the run"""
+
+	run_i		= cube['run'].index(run)
+	number_years	= cube['number_years'][run_i]
+	series		= dict([(variable, cube['SSH'][run_i, variable_i, :number_years]) for variable_i, variable in enumerate(cube['variable'])])
+
+	return cube['time'][run_i, :number_years], series
@@ -0,0 +1,522 @@
+#Functions for fitting the GEV distribution over sliding windows
+
+import os
+import multiprocessing
+import numpy as np
+from scipy import special
+from scipy.optimize import minimize
+from scipy.stats import genextreme
+
+from Functions.Yearly_converter import YearlyConverter
+from Functions.Data_access import ReadVariables, ReadinDataGlobalMean, ReadinDataGlobalSteric
+
+def ReturnLevelSurface(return_period, shape, loc, scale, steps_per_year = 12, shape_min = 1.0e-6):
+	"""Returns the (window, return period) surface of the return levels in one call,
+	the return periods are in years and the distributions are fitted to data with steps_per_year values per year
+	For |shape| < shape_min the Gumbel limit is used"""
+
+	#Parameters along the first axis, return periods along the second axis
+	shape, loc, scale	= [np.atleast_1d(np.asarray(parameter, dtype = float))[:, None] for parameter in [shape, loc, scale]]
+	prob			= 1.0 / (steps_per_year * np.atleast_1d(np.asarray(return_period, dtype = float)))[None]
+	gumbel			= np.fabs(shape) < shape_min
+	shape_fit		= np.where(gumbel, 1.0, shape)
+
+	#Reduced variate, -log(1 - p)
+	y_prob			= -np.log1p(-prob)
+
+	return np.where(gumbel, loc - scale * np.log(y_prob), loc - (scale / shape_fit) * (1.0 - y_prob**(-shape_fit)))
+
+def ReturnTimeSurface(value, shape, loc, scale, steps_per_year = 12, shape_min = 1.0e-6):
+	"""Returns the (window, level) surface of the return times (years) in one call,
+	for |shape| < shape_min the Gumbel limit is used
+	Levels beyond the upper bound of the distribution have an infinite return time,
+	levels below the lower bound are exceeded every time step"""
+
+	shape, loc, scale	= [np.atleast_1d(np.asarray(parameter, dtype = float))[:, None] for parameter in [shape, loc, scale]]
+	value			= np.atleast_1d(np.asarray(value, dtype = float))[None]
+	gumbel			= np.fabs(shape) < shape_min
+	shape_fit		= np.where(gumbel, 1.0, shape)
+	value_norm		= (value - loc) / scale
+
+	with np.errstate(divide = 'ignore', invalid = 'ignore', over = 'ignore'):
+		#Outside the support the exceedance probability is 0 (above the upper bound) or 1 (below the lower bound)
+		support		= 1.0 + shape_fit * value_norm
+		exponent	= np.where(gumbel, np.exp(-value_norm), np.where(support > 0.0, np.fabs(support)**(-1.0 / shape_fit), np.where(shape > 0.0, np.inf, 0.0)))
+		prob		= -np.expm1(-exponent)
+
+		return 1.0 / (steps_per_year * prob)
+
+def TrendRemover(time, data, trend_type):
+	"""Removes trend of choice"""
+	
+	rank = np.polyfit(time, data, trend_type)
+	fitting = 0.0 
+		
+	for rank_i in range(len(rank)):
+			
+		fitting += rank[rank_i] * (time**(len(rank) - 1 - rank_i))
+
+	data -= fitting
+	
+	return data
+
+def SlidingWindows(data, section = 30, steps_per_year = 12):
+	"""Returns the (windows, section * steps_per_year) array of the sliding windows,
+	each window starts one year after the previous one"""
+
+	data		= np.asarray(data, dtype = float)
+	number_windows	= len(data) // steps_per_year + 1 - section
+	window_index	= np.arange(number_windows)[:, None] * steps_per_year + np.arange(section * steps_per_year)[None]
+
+	return data[window_index]
+
+def DetrendWindows(windows, trend_type = 0):
+	"""Removes the trend of choice from each window (rows), returns a copy"""
+
+	windows	= np.array(windows, dtype = float)
+
+	if trend_type > 0:
+		#Remove the trend to get extreme values stationary before the fit
+		for window_i in range(len(windows)):
+			windows[window_i]	= TrendRemover(np.arange(windows.shape[1]), windows[window_i], trend_type)
+
+	return windows
+
+def LMomentsGEV(windows):
+	"""Estimates the GEV parameters from the L-moments (probability weighted moments)
+	for all the windows (rows) in one vectorised pass, Hosking et al. (1985)
+	Returns the shape (reversed, as for the fits), loc and scale of each window"""
+
+	windows		= np.sort(np.atleast_2d(windows), axis = 1)
+	number_data	= windows.shape[1]
+	rank		= np.arange(number_data, dtype = float)
+
+	#Unbiased probability weighted moments b_0, b_1 and b_2
+	b_0		= np.mean(windows, axis = 1)
+	b_1		= np.dot(windows, rank / (number_data - 1.0)) / number_data
+	b_2		= np.dot(windows, rank * (rank - 1.0) / ((number_data - 1.0) * (number_data - 2.0))) / number_data
+
+	return GEVProbabilityWeightedMoments(b_0, b_1, b_2)
+
+def GEVProbabilityWeightedMoments(b_0, b_1, b_2):
+	"""Returns the GEV shape (reversed), loc and scale from the probability weighted moments b_0, b_1 and b_2"""
+
+	#The first three L-moments and the L-skewness
+	l_1		= b_0
+	l_2		= 2.0 * b_1 - b_0
+	l_3		= 6.0 * b_2 - 6.0 * b_1 + b_0
+	t_3		= l_3 / l_2
+
+	#Approximation of the shape parameter (same sign convention as genextreme)
+	c		= 2.0 / (3.0 + t_3) - np.log(2.0) / np.log(3.0)
+	k		= 7.8590 * c + 2.9554 * c**2.0
+	k		= np.where(np.fabs(k) < 1.0e-8, 1.0e-8, k)
+
+	scale		= l_2 * k / ((1.0 - 2.0**(-k)) * special.gamma(1.0 + k))
+	loc		= l_1 - scale * (1.0 - special.gamma(1.0 + k)) / k
+
+	return -k, loc, scale
+
+def WindowRankTable(data):
+	"""Returns the (N, N + 1) table of the number of values before index k which are smaller than value i
+	(ties are ordered by index), the rank of value i within any window [start, end) is then
+	table[i, end] - table[i, start]"""
+
+	data		= np.asarray(data, dtype = float)
+	index		= np.arange(len(data))
+	smaller		= (data[None] < data[:, None]) | ((data[None] == data[:, None]) & (index[None] < index[:, None]))
+	dtype		= np.int16 if len(data) < 2**15 else np.int32
+
+	return np.concatenate((np.zeros((len(data), 1), dtype = dtype), np.cumsum(smaller, axis = 1, dtype = dtype)), axis = 1)
+
+def GEVSectionSweep(data, sections = range(15, 51), trend_type = 0, return_period = 5.0, steps_per_year = 12):
+	"""L-moment GEV fits over the sliding windows (one per year) for a range of window lengths (years)
+	For trend_type = 0 the sorted-data ranks of all windows follow from one rank table (see WindowRankTable)
+	and the probability weighted moments from the ranks, no window is sorted or fitted separately
+	Returns a dictionary with the section, center (window center, years since the start), shape, loc, scale and
+	return_level (one array per section) and the mean and standard deviation of the return levels of each section"""
+
+	data		= np.asarray(data, dtype = float)
+	number_years	= len(data) // steps_per_year
+
+	if trend_type == 0:
+		rank_table	= WindowRankTable(data)
+
+	sweep		= {'section': list(sections), 'center': [], 'shape': [], 'loc': [], 'scale': [], 'return_level': []}
+
+	for section in sections:
+		if trend_type == 0:
+			number_data	= section * steps_per_year
+			window_start	= np.arange(number_years + 1 - section) * steps_per_year
+			window_index	= window_start[:, None] + np.arange(number_data)[None]
+
+			#Rank of each value within its window, the same as the position after sorting
+			rank		= (rank_table[window_index, (window_start + number_data)[:, None]] - rank_table[window_index, window_start[:, None]]).astype(float)
+			windows		= data[window_index]
+
+			b_0		= np.mean(windows, axis = 1)
+			b_1		= np.sum(windows * rank, axis = 1) / (number_data * (number_data - 1.0))
+			b_2		= np.sum(windows * rank * (rank - 1.0), axis = 1) / (number_data * (number_data - 1.0) * (number_data - 2.0))
+
+			shape, loc, scale	= GEVProbabilityWeightedMoments(b_0, b_1, b_2)
+
+		else:
+			#The detrended windows differ for each section
+			shape, loc, scale	= LMomentsGEV(DetrendWindows(SlidingWindows(data, section, steps_per_year), trend_type))
+
+		sweep['center'].append(np.arange(len(shape)) + 0.5 * section)
+		sweep['shape'].append(shape)
+		sweep['loc'].append(loc)
+		sweep['scale'].append(scale)
+		sweep['return_level'].append(ReturnLevelSurface(return_period, shape, loc, scale, steps_per_year)[:, 0])
+
+	sweep['return_level_mean']	= np.asarray([np.mean(return_level) for return_level in sweep['return_level']])
+	sweep['return_level_std']	= np.asarray([np.std(return_level) for return_level in sweep['return_level']])
+
+	return sweep
+
+def GEVFitWindows(arguments):
+	"""Fits the GEV distribution to consecutive windows, each fit starts from the initial guess
+	(shape, loc, scale; None for the default guess), or from the previous window's fit if warm_start
+	Returns the fitted (shape, loc, scale) of each window, the shape is reversed"""
+
+	windows, guesses, warm_start	= arguments
+	fits				= []
+
+	for window_i in range(len(windows)):
+		guess	= guesses[window_i]
+
+		if warm_start and window_i > 0:
+			#Neighbouring windows share most of their data
+			guess	= fits[-1]
+
+		if guess is None:
+			shape, loc, scale	= genextreme.fit(windows[window_i])
+
+		else:
+			#Fit GEV distribution to stationary data, genextreme uses the reversed shape
+			shape, loc, scale	= genextreme.fit(windows[window_i], -guess[0], loc = guess[1], scale = guess[2])
+
+		#Reverse shape (Python reverses the shape fit...)
+		fits.append((-shape, loc, scale))
+
+	return fits
+
+def GEVSlidingWindow(data, section = 30, trend_type = 0, processes = None, method = 'mle', start = None, chunk_size = 8):
+	"""Fits the GEV distribution over all the sliding windows (section in years, monthly data)
+	method = 'mle': maximum likelihood fits, spread over a pool of processes (processes = None uses all cores, 1 is serial)
+	start = None (default guess), 'lmoments' (L-moment estimate of each window) or 'previous' (warm start from the
+	previous window, in blocks of chunk_size windows which each start from their L-moment estimate)
+	method = 'lmoments': L-moment estimates for all windows in one vectorised pass, no optimisation
+	Returns the (detrended) data of each window and the shape, loc and scale, in window order"""
+
+	data_all	= DetrendWindows(SlidingWindows(data, section), trend_type)
+
+	if method == 'lmoments':
+		shape_all, loc_all, scale_all	= LMomentsGEV(data_all)
+
+		return data_all, shape_all, loc_all, scale_all
+
+	if method != 'mle':
+		raise ValueError('Unknown GEV method: '+str(method))
+
+	if start is None:
+		guesses		= [None] * len(data_all)
+
+	elif start == 'lmoments' or start == 'previous':
+		guesses		= list(zip(*LMomentsGEV(data_all)))
+
+	else:
+		raise ValueError('Unknown GEV start: '+str(start))
+
+	#Blocks of consecutive windows, fixed size so the results do not depend on the number of processes
+	chunk_size	= chunk_size if start == 'previous' else 1
+	arguments	= [(data_all[window_i:window_i + chunk_size], guesses[window_i:window_i + chunk_size], start == 'previous') for window_i in range(0, len(data_all), chunk_size)]
+
+	if processes == 1 or len(arguments) <= 1:
+		fits	= [GEVFitWindows(argument) for argument in arguments]
+
+	else:
+		pool	= multiprocessing.Pool(processes)
+
+		try:
+			#The map keeps the order of the windows, independent of the number of processes
+			fits	= pool.map(GEVFitWindows, arguments)
+
+		finally:
+			pool.close()
+			pool.join()
+
+	fits		= [fit for fits_chunk in fits for fit in fits_chunk]
+	shape_all	= np.asarray([fit[0] for fit in fits])
+	loc_all		= np.asarray([fit[1] for fit in fits])
+	scale_all	= np.asarray([fit[2] for fit in fits])
+
+	return data_all, shape_all, loc_all, scale_all
+
+def BootstrapIndices(random_state, number_samples, number_data, block_size = None):
+	"""Returns the (samples, number_data) indices of the resamples, ordinary bootstrap (block_size = None)
+	or moving block bootstrap with blocks of block_size consecutive values"""
+
+	if block_size is None or block_size <= 1:
+		return random_state.randint(0, number_data, (number_samples, number_data))
+
+	block_size	= int(min(block_size, number_data))
+	number_blocks	= int(np.ceil(number_data / float(block_size)))
+	block_start	= random_state.randint(0, number_data - block_size + 1, (number_samples, number_blocks))
+	indices		= block_start[:, :, None] + np.arange(block_size)[None, None]
+
+	return indices.reshape(number_samples, number_blocks * block_size)[:, :number_data]
+
+def GEVBootstrapWindow(arguments):
+	"""Fits the GEV distribution to the resamples of one window, the RNG stream is seeded by (seed, window, chunk)
+	so the resamples do not depend on the number of processes
+	The maximum likelihood fits are warm-started from the point estimate (shape, loc, scale) of the window
+	Returns the (samples, 3) array of the fitted shape (reversed), loc and scale"""
+
+	window, guess, seed, number_samples, block_size, method	= arguments
+
+	random_state	= np.random.RandomState(seed)
+	samples		= window[BootstrapIndices(random_state, number_samples, len(window), block_size)]
+
+	if method == 'lmoments':
+		return np.transpose(LMomentsGEV(samples))
+
+	fits		= np.zeros((number_samples, 3))
+
+	for sample_i in range(number_samples):
+		shape, loc, scale	= genextreme.fit(samples[sample_i], -guess[0], loc = guess[1], scale = guess[2])
+		fits[sample_i]		= -shape, loc, scale
+
+	return fits
+
+def GEVBootstrap(analysis, number_samples = 1000, block_size = None, alpha = 0.05, processes = None, seed = 0, sample_chunk = 100):
+	"""Bootstrap confidence intervals (1 - alpha) of the return level and return time of all the sliding windows
+	of a GEVAnalysis, block_size = None is the ordinary bootstrap, otherwise a moving block bootstrap (months)
+	The resamples are spread over a pool of processes (processes = None uses all cores, 1 is serial)
+	Returns a dictionary with the shape, loc and scale (window, sample) and the lower and upper bounds
+	(window) of the return_level and return_time"""
+
+	data_all	= analysis['data']
+	method		= analysis['method']
+	number_windows	= len(data_all)
+
+	#Fixed chunks of resamples, each with its own RNG stream
+	arguments	= []
+
+	for window_i in range(number_windows):
+		guess	= (analysis['shape'][window_i], analysis['loc'][window_i], analysis['scale'][window_i])
+
+		for sample_i in range(0, number_samples, sample_chunk):
+			arguments.append((data_all[window_i], guess, [seed, window_i, sample_i], min(sample_chunk, number_samples - sample_i), block_size, method))
+
+	if processes == 1 or len(arguments) <= 1:
+		fits	= [GEVBootstrapWindow(argument) for argument in arguments]
+
+	else:
+		pool	= multiprocessing.Pool(processes)
+
+		try:
+			fits	= pool.map(GEVBootstrapWindow, arguments)
+
+		finally:
+			pool.close()
+			pool.join()
+
+	fits		= np.concatenate(fits).reshape(number_windows, number_samples, 3)
+	shape_all	= fits[:, :, 0]
+	loc_all		= fits[:, :, 1]
+	scale_all	= fits[:, :, 2]
+
+	#Return level (return period in years) and return time (years) of the first window's return level
+	return_level	= ReturnLevelSurface(analysis['return_period'], shape_all.ravel(), loc_all.ravel(), scale_all.ravel())[:, 0]
+	return_time	= ReturnTimeSurface(analysis['return_level'][0], shape_all.ravel(), loc_all.ravel(), scale_all.ravel())[:, 0]
+
+	#Percentile bounds from the sorted resamples, which also holds for infinite return times
+	index_lower	= int(np.round(0.5 * alpha * (number_samples - 1)))
+	index_upper	= int(np.round((1.0 - 0.5 * alpha) * (number_samples - 1)))
+	return_level	= np.sort(return_level.reshape(number_windows, number_samples), axis = 1)
+	return_time	= np.sort(return_time.reshape(number_windows, number_samples), axis = 1)
+
+	bootstrap	= {'shape': shape_all, 'loc': loc_all, 'scale': scale_all,
+			   'return_level_lower': return_level[:, index_lower], 'return_level_upper': return_level[:, index_upper],
+			   'return_time_lower': return_time[:, index_lower], 'return_time_upper': return_time[:, index_upper]}
+
+	return bootstrap
+
+def GEVNonStationaryLikelihood(parameters, data, covariate, scale_trend = False, shape_min = 1.0e-6):
+	"""Negative log-likelihood and its analytic gradient of the non-stationary GEV distribution,
+	loc = loc_0 + loc_1 * covariate and log(scale) = scale_0 + scale_1 * covariate (if scale_trend),
+	the shape (same sign as for ReturnLevelSurface) is constant
+	The parameters are (loc_0, loc_1, scale_0, shape) or (loc_0, loc_1, scale_0, scale_1, shape)"""
+
+	if scale_trend:
+		loc_0, loc_1, scale_0, scale_1, shape	= parameters
+
+	else:
+		loc_0, loc_1, scale_0, shape		= parameters
+		scale_1					= 0.0
+
+	loc		= loc_0 + loc_1 * covariate
+	scale		= np.exp(scale_0 + scale_1 * covariate)
+	value_norm	= (data - loc) / scale
+
+	if np.fabs(shape) < shape_min:
+		#Gumbel limit, the shape gradient is the first-order expansion around zero
+		exponent	= np.exp(-value_norm)
+		likelihood	= np.sum(np.log(scale) + value_norm + exponent)
+		grad_norm	= 1.0 - exponent
+		grad_shape	= np.sum(value_norm - 0.5 * value_norm**2.0 * grad_norm)
+
+	else:
+		support		= 1.0 + shape * value_norm
+
+		if np.any(support <= 0.0):
+			#Outside the support of the distribution
+			return np.inf, np.zeros(len(parameters))
+
+		log_support	= np.log(support)
+		exponent	= np.exp(-log_support / shape)
+		likelihood	= np.sum(np.log(scale) + (1.0 + 1.0 / shape) * log_support + exponent)
+		grad_norm	= (1.0 + shape - exponent) / support
+		grad_shape	= np.sum(-(1.0 - exponent) * log_support / shape**2.0 + value_norm * (1.0 + (1.0 - exponent) / shape) / support)
+
+	#Derivatives with respect to loc and log(scale) of each value
+	grad_loc	= -grad_norm / scale
+	grad_scale	= 1.0 - value_norm * grad_norm
+
+	gradient	= [np.sum(grad_loc), np.sum(grad_loc * covariate), np.sum(grad_scale)]
+
+	if scale_trend:
+		gradient.append(np.sum(grad_scale * covariate))
+
+	gradient.append(grad_shape)
+
+	return likelihood, np.asarray(gradient)
+
+def GEVNonStationary(data, covariate, scale_trend = False):
+	"""Fits the non-stationary GEV distribution (see GEVNonStationaryLikelihood) to the full record in one
+	maximum likelihood fit with analytic gradients, the covariate is standardised during the fit
+	Returns a dictionary with loc_0, loc_1, scale_0, scale_1 (log scale), shape, likelihood and success,
+	in the units of the covariate"""
+
+	data		= np.asarray(data, dtype = float)
+	covariate	= np.asarray(covariate, dtype = float)
+
+	#Standardise the covariate to get a well-conditioned problem
+	cov_mean	= np.mean(covariate)
+	cov_std		= np.std(covariate)
+	cov_norm	= (covariate - cov_mean) / cov_std
+
+	#Initial guess from the linear regression and the L-moments of the residuals
+	loc_1, loc_0		= np.polyfit(cov_norm, data, 1)
+	shape, loc, scale	= [parameter[0] for parameter in LMomentsGEV(data - loc_1 * cov_norm)]
+
+	if scale_trend:
+		guess		= [loc, loc_1, np.log(scale), 0.0, shape]
+
+	else:
+		guess		= [loc, loc_1, np.log(scale), shape]
+
+	fit		= minimize(GEVNonStationaryLikelihood, guess, args = (data, cov_norm, scale_trend), jac = True, method = 'BFGS')
+	parameters	= list(fit.x)
+
+	if not scale_trend:
+		parameters.insert(3, 0.0)
+
+	loc_0, loc_1, scale_0, scale_1, shape	= parameters
+
+	#Convert back to the units of the covariate
+	fit_all		= {'loc_0': loc_0 - loc_1 * cov_mean / cov_std, 'loc_1': loc_1 / cov_std,
+			   'scale_0': scale_0 - scale_1 * cov_mean / cov_std, 'scale_1': scale_1 / cov_std,
+			   'shape': shape, 'likelihood': -fit.fun, 'success': fit.success}
+
+	return fit_all
+
+def GEVNonStationaryParameters(fit, covariate):
+	"""Returns the shape, loc and scale of the non-stationary GEV fit at the given covariate values"""
+
+	covariate	= np.asarray(covariate, dtype = float)
+	loc		= fit['loc_0'] + fit['loc_1'] * covariate
+	scale		= np.exp(fit['scale_0'] + fit['scale_1'] * covariate)
+
+	return np.zeros(len(covariate)) + fit['shape'], loc, scale
+
+def ReadinDataNBC(directory):
+	"""Reads-in the monthly maximum sea surface height at the NBC (cm) and removes the
+	globally-averaged sea surface height, the reads are shared through the data-access cache"""
+
+	time, ssh		= ReadVariables(directory+'Ocean/SSH_NBC_monthly_maximum.nc', ['time', 'SSH'])
+
+	#Get the globally-averaged sea surface height
+	time_global, ssh_global	= ReadinDataGlobalMean(directory+'Ocean/SSH_global.nc')
+
+	return time, ssh - ssh_global
+
+def GEVAnalysis(directory, section = 30, trend_type = 0, processes = None, method = 'mle', start = None, return_period = 5.0):
+	"""Sliding-window GEV analysis of the NBC monthly maxima, without any plotting
+	The input is read once and kept, together with the fitted parameters, in the returned dictionary:
+	time, ssh (monthly anomaly), data (window data), shape, loc, scale, method,
+	return_level (return period in years) and return_time (years) of the first window's return level"""
+
+	time, ssh	= ReadinDataNBC(directory)
+
+	#Fit the GEV distribution over all the sliding windows (one window per year)
+	data_all, shape_all, loc_all, scale_all	= GEVSlidingWindow(ssh, section, trend_type, processes, method, start)
+
+	#Return time and level, converted to years
+	return_level_all	= ReturnLevelSurface(return_period, shape_all, loc_all, scale_all)[:, 0]
+	return_time_all		= ReturnTimeSurface(return_level_all[0], shape_all, loc_all, scale_all)[:, 0]
+
+	analysis	= {'time': time, 'ssh': ssh, 'data': data_all, 'shape': shape_all, 'loc': loc_all, 'scale': scale_all,
+			   'return_level': return_level_all, 'return_time': return_time_all, 'section': section, 'return_period': return_period,
+			   'method': method}
+
+	return analysis
+
+def ReadinDataSteric(directory):
+	"""Reads-in the globally-averaged steric sea level (cm, relative to the first year) and removes the drift
+	of the control simulation (yearly averages relative to its first year, the same for each month of the year)"""
+
+	time, steric			= ReadinDataGlobalSteric(directory+'Ocean/SSH_global_steric.nc')
+	time_control, steric_control	= ReadinDataGlobalSteric(os.path.normpath(directory)+'_Control/Ocean/SSH_global_steric.nc')
+
+	time_year, steric_year			= YearlyConverter(time, steric)
+	time_control_year, steric_control_year	= YearlyConverter(time_control, steric_control)
+
+	if len(steric_control_year) * 12 < len(steric):
+		raise ValueError('Control simulation is shorter than the simulation: '+directory)
+
+	#Drift of the control simulation for each month
+	drift		= np.repeat(steric_control_year - steric_control_year[0], 12)[:len(steric)]
+
+	return time, steric - steric_year[0] - drift
+
+def GEVNonStationaryAnalysis(directory, covariate = 'time', scale_trend = False, return_period = 5.0):
+	"""Non-stationary GEV analysis of the NBC monthly maxima, one fit to the full record with the loc
+	(and log scale if scale_trend) linear in time (years) or in the drift-corrected global steric sea level (cm)
+	Returns a dictionary with time, ssh, covariate, fit (see GEVNonStationary), the time_year and covariate_year
+	(yearly mean) and the return_level (return period in years) of each year"""
+
+	time, ssh	= ReadinDataNBC(directory)
+
+	if covariate == 'time':
+		covariate_all	= time / 365.25
+
+	elif covariate == 'steric':
+		#Drift-corrected, as in the SDSL analyses
+		covariate_all	= ReadinDataSteric(directory)[1]
+
+	else:
+		raise ValueError('Unknown GEV covariate: '+str(covariate))
+
+	fit		= GEVNonStationary(ssh, covariate_all, scale_trend)
+
+	#Return levels for each year, from the yearly-averaged covariate
+	time_year, covariate_year	= YearlyConverter(time, covariate_all)
+	return_level_year		= ReturnLevelSurface(return_period, *GEVNonStationaryParameters(fit, covariate_year))[:, 0]
+
+	analysis	= {'time': time, 'ssh': ssh, 'covariate': covariate_all, 'fit': fit, 'time_year': time_year,
+			   'covariate_year': covariate_year, 'return_level': return_level_year, 'return_period': return_period}
+
+	return analysis
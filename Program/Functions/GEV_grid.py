@@ -0,0 +1,160 @@
+#Functions for the GEV return-level maps of the monthly maxima on the (Caribbean) model grid,
+#the domain is processed in spatial tiles on a pool of processes
+
+import multiprocessing
+import numpy as np
+import numpy.ma as ma
+import netCDF4 as netcdf
+
+from Functions.Data_access import DomainIndices, LayoutFilename
+from Functions.Yearly_converter import YearDecoder
+from Functions.GEV_fitting import DetrendWindows, LMomentsGEV, GEVFitWindows, ReturnLevelSurface
+
+def GEVTile(arguments):
+	"""Fits the GEV distribution to the monthly maxima of each (ocean) grid point in the tile,
+	for each period (time slice), the tile is read directly from the input file
+	Returns the (period, 4, y, x) array of the shape, loc, scale and return level"""
+
+	filename, variable, tile_y, tile_x, time_periods, ssh_global_periods, method, trend_type, return_period	= arguments
+
+	#The time series of the points in the tile, from the copy chunked for series when available
+	fh		= netcdf.Dataset(LayoutFilename(filename, 'series'), 'r')
+	ssh_var		= fh.variables[variable]
+	number_y	= len(range(*tile_y.indices(ssh_var.shape[1])))
+	number_x	= len(range(*tile_x.indices(ssh_var.shape[2])))
+
+	fits		= ma.masked_all((len(time_periods), 4, number_y, number_x))
+
+	for period_i in range(len(time_periods)):
+		ssh	= ssh_var[time_periods[period_i], tile_y, tile_x]
+
+		if ssh_global_periods is not None:
+			#Remove the globally-averaged sea surface height
+			ssh	= ssh - ssh_global_periods[period_i][:, None, None]
+
+		#Only the points without any missing value (ocean)
+		ssh	= ma.masked_invalid(ssh).reshape(len(ssh), -1)
+		valid	= np.where(np.all(~ma.getmaskarray(ssh), axis = 0))[0]
+
+		if len(valid) == 0:
+			continue
+
+		data	= DetrendWindows(np.transpose(ma.filled(ssh[:, valid], 0.0)), trend_type)
+
+		if method == 'lmoments':
+			shape, loc, scale	= LMomentsGEV(data)
+
+		else:
+			#Maximum likelihood fits, started from the L-moment estimates
+			fit			= GEVFitWindows((data, list(zip(*LMomentsGEV(data))), False))
+			shape, loc, scale	= np.transpose(fit)
+
+		return_level	= ReturnLevelSurface(return_period, shape, loc, scale)[:, 0]
+
+		for fit_i, fit_value in enumerate([shape, loc, scale, return_level]):
+			fit_point			= ma.masked_all(number_y * number_x)
+			fit_point[valid]		= fit_value
+			fits[period_i, fit_i]		= fit_point.reshape(number_y, number_x)
+
+	fh.close()
+
+	return fits
+
+def GEVReturnLevelGrid(filename_in, filename_out, variable = 'SSH', ssh_global = None, periods = [[2000, 2029], [2070, 2099]], return_period = 5.0, method = 'lmoments', trend_type = 0,
+			lon_min = 270, lon_max = 330, lat_min = -5, lat_max = 25, tile_size = 50, processes = None):
+	"""Return-level maps (return period in years) of the monthly maxima (time, y, x) in filename_in, for each period
+	of years and the change of the last period with respect to the first one, only for the domain of choice
+	ssh_global (monthly, optional) is removed before the fit, method = 'lmoments' (vectorised) or 'mle'
+	The tiles of tile_size x tile_size points are spread over a pool of processes (processes = None uses all cores, 1 is serial)
+	and written to filename_out as they complete"""
+
+	fh_in		= netcdf.Dataset(filename_in, 'r')
+	time		= fh_in.variables['time'][:]
+	ssh_var		= fh_in.variables[variable]
+	dim_y, dim_x	= ssh_var.dimensions[1:]
+
+	lon		= fh_in.variables['lon'][:]
+	lat		= fh_in.variables['lat'][:]
+	domain_y, domain_x	= DomainIndices(lon, lat, lon_min, lon_max, lat_min, lat_max)
+
+	#Contiguous time slices of each period
+	year		= YearDecoder(time)
+	time_periods	= []
+
+	for year_start, year_end in periods:
+		time_index	= np.where((year >= year_start) & (year <= year_end))[0]
+		time_periods.append(slice(time_index[0], time_index[-1] + 1))
+
+	ssh_global_periods	= None if ssh_global is None else [np.asarray(ssh_global)[time_period] for time_period in time_periods]
+
+	#-----------------------------------------------------------------------------------------
+	fh_out		= netcdf.Dataset(filename_out, 'w')
+
+	number_y	= domain_y.stop - domain_y.start
+	number_x	= domain_x.stop - domain_x.start
+
+	fh_out.createDimension('period', len(periods))
+	fh_out.createDimension(dim_y, number_y)
+	fh_out.createDimension(dim_x, number_x)
+
+	#Copy the grid of the domain (1-D or curvilinear)
+	for coord in ['lat', 'lon']:
+		coord_in	= fh_in.variables[coord]
+		coord_out	= fh_out.createVariable(coord, float, coord_in.dimensions)
+
+		if coord_in.ndim == 2:
+			coord_out[:]	= coord_in[domain_y, domain_x]
+
+		else:
+			coord_out[:]	= coord_in[domain_y if coord == 'lat' else domain_x]
+
+		if 'units' in coord_in.ncattrs():
+			coord_out.units	= coord_in.units
+
+	fh_in.close()
+
+	period_start_out	= fh_out.createVariable('period_start', float, ('period',))
+	period_end_out		= fh_out.createVariable('period_end', float, ('period',))
+	fit_out			= [fh_out.createVariable(fit, 'f4', ('period', dim_y, dim_x), zlib = True, fill_value = 1.0e20) for fit in ['shape', 'loc', 'scale', 'return_level']]
+	change_out		= fh_out.createVariable('return_level_change', 'f4', (dim_y, dim_x), zlib = True, fill_value = 1.0e20)
+
+	period_start_out[:]	= [period[0] for period in periods]
+	period_end_out[:]	= [period[1] for period in periods]
+	fit_out[3].long_name	= 'Return level ('+str(return_period)+' years)'
+	fit_out[3].units	= 'cm'
+	change_out.long_name	= 'Return level change, last minus first period'
+	change_out.units	= 'cm'
+
+	#The tiles relative to the domain and in the input file
+	tiles		= []
+	arguments	= []
+
+	for y_start in range(0, number_y, tile_size):
+		for x_start in range(0, number_x, tile_size):
+			tile_y, tile_x	= slice(y_start, min(y_start + tile_size, number_y)), slice(x_start, min(x_start + tile_size, number_x))
+			tiles.append((tile_y, tile_x))
+			arguments.append((filename_in, variable, slice(domain_y.start + tile_y.start, domain_y.start + tile_y.stop), slice(domain_x.start + tile_x.start, domain_x.start + tile_x.stop),
+						time_periods, ssh_global_periods, method, trend_type, return_period))
+
+	if processes == 1 or len(arguments) <= 1:
+		fits_all	= (GEVTile(argument) for argument in arguments)
+		pool		= None
+
+	else:
+		#The imap keeps the order of the tiles, only a few tiles are kept in memory
+		pool		= multiprocessing.Pool(processes)
+		fits_all	= pool.imap(GEVTile, arguments)
+
+	try:
+		for (tile_y, tile_x), fits in zip(tiles, fits_all):
+			for fit_i in range(4):
+				fit_out[fit_i][:, tile_y, tile_x]	= fits[:, fit_i]
+
+			change_out[tile_y, tile_x]	= fits[-1, 3] - fits[0, 3]
+
+	finally:
+		if pool is not None:
+			pool.close()
+			pool.join()
+
+	fh_out.close()
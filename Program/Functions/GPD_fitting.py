@@ -0,0 +1,132 @@
+#Functions for the peaks-over-threshold (generalised Pareto) analysis of the full monthly record
+
+import numpy as np
+from scipy.stats import genpareto
+
+from Functions.GEV_fitting import TrendRemover, ReadinDataNBC
+
+def DeclusterRuns(data, threshold, run_length = 1):
+	"""Runs declustering, exceedances of the threshold separated by fewer than run_length
+	values below the threshold belong to the same cluster
+	Returns the indices of the cluster maxima"""
+
+	data		= np.asarray(data, dtype = float)
+	index		= np.where(data > threshold)[0]
+
+	if len(index) == 0:
+		return index
+
+	#A new cluster starts after a gap of at least run_length values
+	new_cluster	= np.append(True, np.diff(index) > run_length)
+	cluster_id	= np.cumsum(new_cluster) - 1
+
+	#Sort on cluster and decreasing value (stable, first occurrence of the maximum)
+	order		= np.lexsort((-data[index], cluster_id))
+
+	return index[order[np.where(new_cluster)[0]]]
+
+def GPDFit(excess, method = 'mle'):
+	"""Fits the generalised Pareto distribution to the excesses over the threshold,
+	method = 'mle' (maximum likelihood, started from the PWM estimate when inside the support) or 'pwm' (probability weighted moments)
+	Returns the shape (positive for a heavy tail) and scale"""
+
+	excess		= np.sort(np.asarray(excess, dtype = float))
+	number_excess	= len(excess)
+
+	#Probability weighted moments, Hosking and Wallis (1987)
+	l_1		= np.mean(excess)
+	l_2		= 2.0 * np.dot(excess, np.arange(number_excess) / (number_excess - 1.0)) / number_excess - l_1
+	shape		= 2.0 - l_1 / l_2
+	scale		= l_1 * (1.0 - shape)
+
+	if method == 'pwm':
+		return shape, scale
+
+	if method != 'mle':
+		raise ValueError('Unknown GPD method: '+str(method))
+
+	if shape < 0.0 and -scale / shape <= excess[-1]:
+		#The upper endpoint of the PWM estimate is below the largest excess (zero likelihood), use the default start
+		shape, loc, scale	= genpareto.fit(excess, floc = 0.0)
+
+	else:
+		shape, loc, scale	= genpareto.fit(excess, shape, floc = 0.0, scale = scale)
+
+	if not np.isfinite(genpareto.nnlf((shape, 0.0, scale), excess)) or shape < -1.0:
+		#Outside the support or no regular maximum likelihood estimate (shape < -1)
+		raise ValueError('No valid GPD fit, shape = '+str(shape)+', scale = '+str(scale))
+
+	return shape, scale
+
+def ThresholdStability(data, thresholds):
+	"""Threshold-stability diagnostics for all thresholds in one pass over the sorted data,
+	from suffix sums of the data (no declustering)
+	Returns the number of exceedances, mean excess (mean residual life), PWM shape,
+	PWM scale and modified scale (scale - shape * threshold) for each threshold"""
+
+	data		= np.sort(np.asarray(data, dtype = float))
+	thresholds	= np.asarray(thresholds, dtype = float)
+	rank		= np.arange(len(data), dtype = float)
+
+	#Suffix sums of the data and rank-weighted data, zero appended for the empty suffix
+	sum_data	= np.append(np.cumsum(data[::-1])[::-1], 0.0)
+	sum_rank	= np.append(np.cumsum((rank * data)[::-1])[::-1], 0.0)
+
+	start		= np.searchsorted(data, thresholds, side = 'right')
+	number_excess	= len(data) - start
+
+	with np.errstate(divide = 'ignore', invalid = 'ignore'):
+		#Excesses y_i = x_(start + i) - u, with rank i within the exceedances
+		sum_excess	= sum_data[start] - number_excess * thresholds
+		sum_rank_excess	= sum_rank[start] - start * sum_data[start] - thresholds * 0.5 * number_excess * (number_excess - 1.0)
+
+		l_1		= sum_excess / number_excess
+		l_2		= 2.0 * sum_rank_excess / (number_excess * (number_excess - 1.0)) - l_1
+		shape		= 2.0 - l_1 / l_2
+		scale		= l_1 * (1.0 - shape)
+
+	#At least 3 exceedances for the moments
+	invalid		= number_excess < 3
+	l_1, shape, scale	= [np.where(invalid, np.nan, value) for value in [l_1, shape, scale]]
+
+	return number_excess, l_1, shape, scale, scale - shape * thresholds
+
+def GPDReturnLevel(return_period, threshold, shape, scale, rate, shape_min = 1.0e-6):
+	"""Returns the return levels for the return periods (years), rate is the number of
+	(declustered) exceedances per year, for |shape| < shape_min the exponential limit is used"""
+
+	events		= rate * np.asarray(return_period, dtype = float)
+
+	if np.fabs(shape) < shape_min:
+		return threshold + scale * np.log(events)
+
+	return threshold + (scale / shape) * (events**shape - 1.0)
+
+def POTAnalysis(directory, quantile = 0.9, run_length = 1, trend_type = 0, method = 'mle', return_period = 5.0, number_thresholds = 50):
+	"""Peaks-over-threshold analysis of the NBC monthly maxima (full record), the threshold is the
+	quantile of choice, the exceedances are declustered (runs) before the GPD fit
+	Returns a dictionary with time, ssh (optionally detrended), threshold, peak (indices), shape, scale,
+	rate (clusters per year), return_level and the threshold-stability diagnostics (thresholds, number_excess,
+	mean_excess, shape_all, scale_all, scale_modified)"""
+
+	time, ssh	= ReadinDataNBC(directory)
+	ssh		= np.array(ssh, dtype = float)
+
+	if trend_type > 0:
+		ssh	= TrendRemover(np.arange(len(ssh)), ssh, trend_type)
+
+	threshold	= np.percentile(ssh, 100.0 * quantile)
+	peak		= DeclusterRuns(ssh, threshold, run_length)
+	shape, scale	= GPDFit(ssh[peak] - threshold, method)
+	rate		= len(peak) / (len(ssh) / 12.0)
+
+	#Diagnostics over the upper part of the distribution
+	thresholds	= np.linspace(np.percentile(ssh, 50.0), np.percentile(ssh, 99.0), number_thresholds)
+	number_excess, mean_excess, shape_all, scale_all, scale_modified	= ThresholdStability(ssh, thresholds)
+
+	analysis	= {'time': time, 'ssh': ssh, 'threshold': threshold, 'peak': peak, 'shape': shape, 'scale': scale, 'rate': rate,
+			   'return_level': GPDReturnLevel(return_period, threshold, shape, scale, rate), 'return_period': return_period,
+			   'thresholds': thresholds, 'number_excess': number_excess, 'mean_excess': mean_excess,
+			   'shape_all': shape_all, 'scale_all': scale_all, 'scale_modified': scale_modified}
+
+	return analysis
@@ -0,0 +1,355 @@
+#Functions for generating the (processed) products on demand, each product is registered with its file name
+#scheme, its inputs (lower-level products) and the function which generates it from these inputs
+
+import errno
+import os
+import time as time_module
+import numpy as np
+import numpy.ma as ma
+import netCDF4 as netcdf
+
+from Functions.Data_catalog import data_directory
+from Functions.Data_access import CreateGrid, LayoutFilename, ReadinDataGlobalMean, ReadinDataGlobalSteric
+from Functions.Yearly_converter import YearDecoder, YearlyConverter
+from Functions.Significant_trend import SignificantTrendBatch
+from Functions.Trend_sections_grid import TrendSectionsGrid
+from Functions.GEV_grid import GEVReturnLevelGrid
+from Functions.Block_maxima import BlockMaxima, WriteBlockMaxima
+
+#The registered products, name: (file name relative to the run directory, inputs, generator)
+product_registry	= {}
+
+#The products which are available in this session, (name, run, parameters): file name
+product_available	= {}
+
+#Seconds after which the lock of a product is considered stale (e.g. an interrupted generator)
+lock_timeout		= 24 * 3600.0
+
+def RegisterProduct(name, template, generator = None, inputs = None):
+	"""Registers a product, the template is the file name relative to the run directory, e.g. 'Ocean/SSH_global.nc',
+	formatted with the parameters of the request
+	inputs(run, parameters) returns the requests (name, run, parameters) of the lower-level products and
+	generator(filename, filenames_inputs, parameters) writes the product, without a generator the product is an input only"""
+
+	product_registry[name]	= (template, inputs, generator)
+
+def RequestKey(name, run, parameters):
+	"""Returns the (hashable) key of a product request"""
+
+	return name, run, tuple(sorted(parameters.items()))
+
+def RequestFilename(name, run, parameters, directory = data_directory):
+	"""Returns the file name of a product request, following the naming scheme of the Data directory"""
+
+	if name not in product_registry:
+		raise ValueError('Unknown product: '+str(name))
+
+	return os.path.join(directory, run, product_registry[name][0].format(**parameters))
+
+def AcquireLock(filename_lock):
+	"""Creates the lock file of a product, returns False if the product is already generated by another process"""
+
+	try:
+		os.close(os.open(filename_lock, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+		return True
+
+	except OSError as error:
+		if error.errno != errno.EEXIST:
+			#Not locked, but not possible to create the lock (e.g. no permission or no directory)
+			raise
+
+		try:
+			if time_module.time() - os.path.getmtime(filename_lock) > lock_timeout:
+				#Stale lock, take it over
+				os.remove(filename_lock)
+
+		except OSError:
+			#Removed in the meantime
+			pass
+
+		return False
+
+def RequireProduct(name, run, directory = data_directory, requested = (), **parameters):
+	"""Returns the file name of the product for the run (e.g. 'HR-CESM' or 'CMIP6/CanESM5') and the parameters of choice,
+	a missing product is generated from its inputs (which are required first) and stored under the same naming scheme
+	Each request is only generated once, also when several scripts (processes) require the same product"""
+
+	key		= RequestKey(name, run, parameters)
+	filename	= RequestFilename(name, run, parameters, directory)
+
+	if key in product_available and os.path.exists(filename):
+		return filename
+
+	if key in requested:
+		raise ValueError('Circular dependency of product: '+str(name))
+
+	template, inputs, generator	= product_registry[name]
+
+	while not os.path.exists(filename):
+		if generator is None:
+			raise IOError('Input is not available and can not be generated: '+filename)
+
+		#Required inputs (dependencies) first
+		filenames_inputs	= [RequireProduct(name_input, run_input, directory, requested + (key,), **parameters_input) for name_input, run_input, parameters_input in inputs(run, parameters)]
+
+		if not AcquireLock(filename+'.lock'):
+			#Generated by another process, wait until it is finished
+			time_module.sleep(1.0)
+			continue
+
+		try:
+			if not os.path.exists(filename):
+				#Write to a temporary file first, so a product is always complete
+				filename_temp	= filename+'_'+str(os.getpid())+'.tmp'
+
+				try:
+					generator(filename_temp, filenames_inputs, parameters)
+					os.rename(filename_temp, filename)
+
+				finally:
+					if os.path.exists(filename_temp):
+						#The generator failed, remove the incomplete product
+						os.remove(filename_temp)
+
+		finally:
+			os.remove(filename+'.lock')
+
+	product_available[key]	= filename
+
+	return filename
+
+#-----------------------------------------------------------------------------------------
+
+def ControlRequest(run):
+	"""Returns the request of the global steric sea level of the control run, in the control run directory (CESM)
+	or in the model directory (CMIP6)"""
+
+	if run.startswith('CMIP6'):
+		return 'SSH_global_steric_Control', run, {}
+
+	return 'SSH_global_steric', run+'_Control', {}
+
+def TrendMapInputs(run, parameters):
+	"""Returns the inputs of the SDSL trend map"""
+
+	return [('SSH', run, {}), ('SSH_global', run, {}), ('SSH_global_steric', run, {}), ControlRequest(run)]
+
+def UVTrendMapInputs(run, parameters):
+	"""Returns the input of the velocity trend map, the depth-averaged velocities"""
+
+	return [('UV_depth', run, {'depth_min': parameters['depth_min'], 'depth_max': parameters['depth_max']})]
+
+def GEVMapInputs(run, parameters):
+	"""Returns the inputs of the GEV return-level map, the monthly maxima and the global mean sea surface height"""
+
+	return [('SSH_monthly_maximum', run, {}), ('SSH_global', run, {})]
+
+def MonthlyMaximumInputs(run, parameters):
+	"""Returns the input of the monthly maxima, the daily (or sub-daily) sea surface height"""
+
+	return [('SSH_daily', run, {})]
+
+def UVDepthInputs(run, parameters):
+	"""Returns the input of the depth-averaged velocities, the velocities at all depths"""
+
+	return [('UV', run, {})]
+
+def YearIndex(time_year, year_start, year_end):
+	"""Returns the (contiguous) slice of the years of choice"""
+
+	year	= YearDecoder(time_year)
+	index	= np.where((year >= year_start) & (year <= year_end))[0]
+
+	return slice(index[0], index[-1] + 1)
+
+def GlobalYearly(filenames_inputs, month_start, month_end):
+	"""Returns the yearly time, the yearly global mean sea surface height and the drift-corrected global steric
+	sea level (relative to the first year), from the global mean, global steric and control global steric inputs"""
+
+	file_ssh_global, file_steric, file_steric_control	= filenames_inputs
+
+	time, ssh_global		= ReadinDataGlobalMean(file_ssh_global)
+	time_steric, steric		= ReadinDataGlobalSteric(file_steric)
+	time_control, steric_control	= ReadinDataGlobalSteric(file_steric_control)
+
+	time_year, ssh_global_year	= YearlyConverter(time, ssh_global, month_start, month_end)
+	time_steric_year, steric_year	= YearlyConverter(time_steric, steric, month_start, month_end)
+	time_control_year, steric_control_year	= YearlyConverter(time_control, steric_control, month_start, month_end)
+
+	#Remove the drift of the control simulation (relative to the first year)
+	steric_control_year	= steric_control_year - steric_control_year[0]
+	steric_year		= steric_year - steric_year[0] - steric_control_year
+
+	return time_year, ssh_global_year, steric_year
+
+def SDSLTrendMap(filename, filenames_inputs, parameters, tile_size = 50):
+	"""Generates the SDSL trend (cm per decade) over the years of choice, the sea surface height (time, y, x) with the
+	global mean removed plus the drift-corrected global steric sea level, and the trend normalised by the global steric trend"""
+
+	file_ssh	= filenames_inputs[0]
+	month_start, month_end	= parameters['month_start'], parameters['month_end']
+
+	time_year, ssh_global_year, steric_year	= GlobalYearly(filenames_inputs[1:], month_start, month_end)
+
+	year_index		= YearIndex(time_year, parameters['year_start'], parameters['year_end'])
+	steric_year		= steric_year[year_index]
+
+	#The trend of the global steric contribution, the same for all grid points
+	trend_steric		= SignificantTrendBatch(time_year[year_index], steric_year[:, None])[0][0] * 10.0
+
+	#The time series of the rows, from the copy chunked for series when available
+	fh_in		= netcdf.Dataset(LayoutFilename(file_ssh, 'series'), 'r')
+	time		= fh_in.variables['time'][:]
+	ssh_var		= fh_in.variables['SSH']
+	dim_y, dim_x	= ssh_var.dimensions[1:]
+
+	fh_out		= netcdf.Dataset(filename, 'w')
+
+	CreateGrid(fh_in, fh_out, [dim_y, dim_x])
+
+	trend_out	= [fh_out.createVariable(variable, float, (dim_y, dim_x), fill_value = 1.0e20) for variable in ['SSH_trend', 'SSH_trend_sig', 'SSH_trend_norm', 'SSH_trend_norm_sig']]
+
+	trend_out[0].longname	= 'Local sea surface height trend per decade'
+	trend_out[0].units	= 'cm per decade'
+	trend_out[1].longname	= 'Level of significance'
+	trend_out[2].longname	= 'Local sea surface height trend normalised to global trend'
+	trend_out[3].longname	= 'Level of significance'
+
+	for y_start in range(0, ssh_var.shape[1], tile_size):
+		#Only read the hyperslab of the current rows
+		tile_y			= slice(y_start, min(y_start + tile_size, ssh_var.shape[1]))
+		time_year, ssh_year	= YearlyConverter(time, ssh_var[:, tile_y], month_start, month_end)
+
+		#Remove the global mean and set the first year to 0, then add the global steric contribution
+		ssh_year		= ssh_year - ssh_global_year[:, None, None]
+		ssh_year		= ssh_year - ssh_year[0]
+		ssh_year		= ssh_year[year_index] + steric_year[:, None, None]
+
+		trend, error, significant	= SignificantTrendBatch(time_year[year_index], ssh_year)
+
+		trend_out[0][tile_y]	= trend * 10.0
+		trend_out[1][tile_y]	= significant
+		trend_out[2][tile_y]	= trend * 10.0 / trend_steric
+		trend_out[3][tile_y]	= significant
+
+	fh_in.close()
+	fh_out.close()
+
+def SDSLTrendSections(filename, filenames_inputs, parameters):
+	"""Generates the normalised SDSL trend over all sections (start year, end year) for each grid point
+	of the Caribbean domain, see TrendSectionsGrid"""
+
+	month_start, month_end	= parameters['month_start'], parameters['month_end']
+
+	time_year, ssh_global_year, steric_year	= GlobalYearly(filenames_inputs[1:], month_start, month_end)
+
+	TrendSectionsGrid(filenames_inputs[0], filename, ssh_global_year, steric_year, 'SSH', month_start, month_end)
+
+def GEVReturnLevelMap(filename, filenames_inputs, parameters):
+	"""Generates the GEV return-level maps of the monthly maxima (global mean removed) for 2000 - 2029 and 2070 - 2099,
+	see GEVReturnLevelGrid, the number of processes (optional) is not part of the product"""
+
+	time, ssh_global	= ReadinDataGlobalMean(filenames_inputs[1])
+
+	GEVReturnLevelGrid(filenames_inputs[0], filename, 'SSH', ssh_global, [[2000, 2029], [2070, 2099]], parameters['return_period'], parameters['method'],
+				parameters['trend_type'], processes = parameters.get('processes'))
+
+def MonthlyMaximum(filename, filenames_inputs, parameters):
+	"""Generates the monthly maxima (time, y, x) of the daily (or sub-daily) sea surface height and the time
+	of the maximum, see BlockMaxima"""
+
+	time, ssh_max, time_max	= BlockMaxima(filenames_inputs[0], 'SSH')['month']
+
+	WriteBlockMaxima(filename, time, ssh_max, time_max, 'SSH', filename_grid = filenames_inputs[0])
+
+def UVDepthAverage(filename, filenames_inputs, parameters):
+	"""Generates the monthly velocities (cm / s) averaged over the depth range of choice (m), weighted by the layer thickness"""
+
+	#The velocities at one time, from the copy chunked for maps when available
+	fh_in		= netcdf.Dataset(LayoutFilename(filenames_inputs[0], 'map'), 'r')
+	depth		= fh_in.variables['depth'][:]
+	uvel_var	= fh_in.variables['UVEL']
+	dim_y, dim_x	= uvel_var.dimensions[2:]
+
+	#Layer boundaries halfway between the layer depths, the first layer starts at the surface
+	depth_bounds	= np.append(0.0, np.append(0.5 * (depth[1:] + depth[:-1]), 1.5 * depth[-1] - 0.5 * depth[-2]))
+	layer		= np.maximum(np.minimum(depth_bounds[1:], parameters['depth_max']) - np.maximum(depth_bounds[:-1], parameters['depth_min']), 0.0)
+	depth_index	= np.where(layer > 0)[0]
+	layer		= layer[depth_index]
+
+	fh_out		= netcdf.Dataset(filename, 'w')
+
+	fh_out.createDimension('time', len(fh_in.dimensions['time']))
+	CreateGrid(fh_in, fh_out, [dim_y, dim_x])
+
+	time_out	= fh_out.createVariable('time', float, ('time',))
+	time_out.units	= 'Days since 0001-01-01 00:00:00 UTC'
+	time_out[:]	= fh_in.variables['time'][:]
+
+	for variable in ['UVEL', 'VVEL']:
+		var_in		= fh_in.variables[variable]
+		var_out		= fh_out.createVariable(variable, float, ('time', dim_y, dim_x), zlib = True, fill_value = 1.0e20)
+		var_out.units	= 'cm / s'
+
+		for time_i in range(len(time_out)):
+			#Layers without any data (e.g. below the bottom) do not contribute
+			vel		= ma.masked_invalid(var_in[time_i, depth_index[0]:depth_index[-1] + 1])
+			layer_valid	= ma.masked_array(np.ones(vel.shape) * layer[:, None, None], mask = ma.getmaskarray(vel))
+			var_out[time_i]	= ma.sum(vel * layer_valid, axis = 0) / ma.sum(layer_valid, axis = 0)
+
+	fh_in.close()
+	fh_out.close()
+
+def UVTrendMap(filename, filenames_inputs, parameters, tile_size = 50):
+	"""Generates the trend (cm / s per decade) of the horizontal velocity over the years of choice,
+	from the monthly depth-averaged velocities"""
+
+	month_start, month_end	= parameters['month_start'], parameters['month_end']
+
+	#The time series of the rows, from the copy chunked for series when available
+	fh_in		= netcdf.Dataset(LayoutFilename(filenames_inputs[0], 'series'), 'r')
+	time		= fh_in.variables['time'][:]
+	uvel_var	= fh_in.variables['UVEL']
+	vvel_var	= fh_in.variables['VVEL']
+	dim_y, dim_x	= uvel_var.dimensions[1:]
+
+	fh_out		= netcdf.Dataset(filename, 'w')
+
+	CreateGrid(fh_in, fh_out, [dim_y, dim_x])
+
+	trend_out	= [fh_out.createVariable(variable, float, (dim_y, dim_x), fill_value = 1.0e20) for variable in ['VEL_trend', 'VEL_trend_sig']]
+
+	trend_out[0].longname	= 'Local horizontal velocity trend per decade'
+	trend_out[0].units	= 'cm / s per decade'
+	trend_out[1].longname	= 'Level of significance'
+
+	for y_start in range(0, uvel_var.shape[1], tile_size):
+		#Only read the hyperslab of the current rows
+		tile_y			= slice(y_start, min(y_start + tile_size, uvel_var.shape[1]))
+		vel			= ma.sqrt(uvel_var[:, tile_y]**2.0 + vvel_var[:, tile_y]**2.0)
+		time_year, vel_year	= YearlyConverter(time, vel, month_start, month_end)
+		year_index		= YearIndex(time_year, parameters['year_start'], parameters['year_end'])
+
+		trend, error, significant	= SignificantTrendBatch(time_year[year_index], vel_year[year_index])
+
+		trend_out[0][tile_y]	= trend * 10.0
+		trend_out[1][tile_y]	= significant
+
+	fh_in.close()
+	fh_out.close()
+
+#The model output (inputs only)
+RegisterProduct('SSH', 'Ocean/SSH.nc')
+RegisterProduct('UV', 'Ocean/UV.nc')
+RegisterProduct('SSH_global', 'Ocean/SSH_global.nc')
+RegisterProduct('SSH_global_steric', 'Ocean/SSH_global_steric.nc')
+RegisterProduct('SSH_global_steric_Control', 'Ocean/SSH_global_steric_Control.nc')
+RegisterProduct('SSH_daily', 'Ocean/SSH_daily.nc')
+
+#The derived products
+RegisterProduct('SSH_monthly_maximum', 'Ocean/SSH_monthly_maximum.nc', MonthlyMaximum, MonthlyMaximumInputs)
+RegisterProduct('UV_depth', 'Ocean/UV_depth_{depth_min}-{depth_max}_m.nc', UVDepthAverage, UVDepthInputs)
+RegisterProduct('UV_trend', 'Ocean/UV_trend_depth_{depth_min}-{depth_max}_m_year_{year_start}-{year_end}_month_{month_start}-{month_end}.nc', UVTrendMap, UVTrendMapInputs)
+RegisterProduct('SSH_sterodynamic_trend', 'Ocean/SSH_sterodynamic_trend_year_{year_start}-{year_end}_month_{month_start}-{month_end}.nc', SDSLTrendMap, TrendMapInputs)
+RegisterProduct('SSH_trend_sections', 'Ocean/SSH_sterodynamic_trend_sections_month_{month_start}-{month_end}.nc', SDSLTrendSections, TrendMapInputs)
+RegisterProduct('SSH_monthly_maximum_GEV', 'Ocean/SSH_monthly_maximum_GEV_return_level_{return_period:g}_year_{method}_trend_{trend_type}.nc', GEVReturnLevelMap, GEVMapInputs)
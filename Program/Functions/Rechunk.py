@@ -0,0 +1,135 @@
+#Functions for rewriting a (derived) product with the chunking and compression of an access pattern,
+#full time series at a few points ('series', e.g. extremes) or full maps at one time ('map', e.g. trend plots)
+#Usage as a command: python Rechunk.py series|map [--replace] filename(s)
+
+import os
+import sys
+import numpy as np
+import netCDF4 as netcdf
+
+if __name__ == '__main__':
+	#Shared functions, relative to this directory
+	sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from Functions.Data_access import LayoutName
+
+#Size (bytes) of a (series) chunk, the maximum size of a map chunk and the memory used for copying a variable
+chunk_bytes	= 2**20
+map_bytes	= 2**24
+memory_bytes	= 2**28
+
+def ChunkSizes(shape, dimensions, pattern, itemsize):
+	"""Returns the chunk sizes of a (time, ...) variable for the access pattern of choice,
+	None for the variables without a time axis (default chunking)"""
+
+	if 'time' not in dimensions:
+		return None
+
+	time_axis	= list(dimensions).index('time')
+	space_axes	= [axis for axis in range(len(shape)) if axis != time_axis]
+	chunks		= [max(1, size) for size in shape]
+
+	if len(space_axes) == 0:
+		#A single series
+		return chunks
+
+	if pattern == 'series':
+		#The full time series, the points in a (square) tile
+		number_points	= max(1, chunk_bytes // (itemsize * chunks[time_axis]))
+		side		= max(1, int(number_points**(1.0 / len(space_axes))))
+
+		for axis in space_axes:
+			chunks[axis]	= min(chunks[axis], side)
+
+	elif pattern == 'map':
+		#A full map at one time, split along the first spatial axis when too large
+		chunks[time_axis]	= 1
+		map_size		= itemsize * np.prod([chunks[axis] for axis in space_axes])
+
+		if map_size > map_bytes:
+			chunks[space_axes[0]]	= max(1, int(chunks[space_axes[0]] * map_bytes // map_size))
+
+	else:
+		raise ValueError('Unknown access pattern: '+str(pattern))
+
+	return chunks
+
+def CopyVariable(var_in, var_out, chunks, pattern):
+	"""Copies the variable in blocks which fit in memory, aligned with the output chunks,
+	along the time axis (map) or the first spatial axis (series)"""
+
+	if var_in.ndim == 0:
+		var_out.assignValue(var_in.getValue())
+		return
+
+	if chunks is None or var_in.ndim == 1:
+		var_out[:]	= var_in[:]
+		return
+
+	time_axis	= list(var_in.dimensions).index('time')
+	axis		= time_axis if pattern == 'map' else [axis for axis in range(var_in.ndim) if axis != time_axis][0]
+
+	#Number of chunks along the axis which fit in memory
+	block_bytes	= var_in.dtype.itemsize * np.prod(var_in.shape) // max(1, var_in.shape[axis]) * chunks[axis]
+	block		= chunks[axis] * max(1, int(memory_bytes // max(1, block_bytes)))
+
+	for start in range(0, var_in.shape[axis], block):
+		index		= [slice(None)] * var_in.ndim
+		index[axis]	= slice(start, min(start + block, var_in.shape[axis]))
+		var_out[tuple(index)]	= var_in[tuple(index)]
+
+def RechunkFile(filename, pattern, replace = False, complevel = 4):
+	"""Rewrites the file with the chunking of the access pattern (series or map) and compression,
+	as a copy next to the file (see LayoutFilename, which then selects the copy) or replacing the file
+	Returns the file name of the rewritten file"""
+
+	filename_out	= LayoutName(filename, pattern)
+	filename_temp	= filename_out+'_'+str(os.getpid())+'.tmp'
+
+	fh_in		= netcdf.Dataset(filename, 'r')
+	fh_out		= netcdf.Dataset(filename_temp, 'w', format = fh_in.data_model)
+
+	try:
+		fh_out.setncatts(dict([(attr, fh_in.getncattr(attr)) for attr in fh_in.ncattrs()]))
+
+		for dim in fh_in.dimensions:
+			fh_out.createDimension(dim, None if fh_in.dimensions[dim].isunlimited() else len(fh_in.dimensions[dim]))
+
+		for variable in fh_in.variables:
+			var_in		= fh_in.variables[variable]
+			chunks		= ChunkSizes(var_in.shape, var_in.dimensions, pattern, var_in.dtype.itemsize)
+			fill_value	= var_in.getncattr('_FillValue') if '_FillValue' in var_in.ncattrs() else None
+
+			if var_in.ndim == 0:
+				var_out	= fh_out.createVariable(variable, var_in.dtype, (), fill_value = fill_value)
+
+			else:
+				var_out	= fh_out.createVariable(variable, var_in.dtype, var_in.dimensions, zlib = True, complevel = complevel, shuffle = True,
+								chunksizes = chunks, fill_value = fill_value)
+
+			var_out.setncatts(dict([(attr, var_in.getncattr(attr)) for attr in var_in.ncattrs() if attr != '_FillValue']))
+
+			CopyVariable(var_in, var_out, chunks, pattern)
+
+	finally:
+		fh_in.close()
+		fh_out.close()
+
+	if replace:
+		filename_out	= filename
+
+	os.rename(filename_temp, filename_out)
+
+	return filename_out
+
+if __name__ == '__main__':
+	arguments	= sys.argv[1:]
+	replace		= '--replace' in arguments
+	arguments	= [argument for argument in arguments if argument != '--replace']
+
+	if len(arguments) < 2 or arguments[0] not in ['series', 'map']:
+		print('Usage: python Rechunk.py series|map [--replace] filename(s)')
+		sys.exit(1)
+
+	for filename in arguments[1:]:
+		print(filename+' -> '+RechunkFile(filename, arguments[0], replace))
@@ -0,0 +1,118 @@
+#Functions for a persistent (on-disk) cache of derived series, e.g. the yearly averages,
+#each result is stored as a compressed numpy file named after the hash of its inputs
+
+import hashlib
+import os
+import numpy as np
+import numpy.ma as ma
+
+from Functions.Data_access import ReadVariables
+from Functions.Yearly_converter import YearlyConverterBatch
+
+#Directory of the cached results, relative to this directory
+cache_directory	= os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'Data', 'Cache')
+
+#Identify the source files by their content (slower) instead of their modification time and size
+hash_files	= False
+
+def FileSignature(filename):
+	"""Returns the signature of a source file, (path, modification time, size) or (path, content hash)"""
+
+	filename	= os.path.abspath(filename)
+
+	if not hash_files:
+		return filename, os.path.getmtime(filename), os.path.getsize(filename)
+
+	file_hash	= hashlib.sha1()
+	fh		= open(filename, 'rb')
+
+	try:
+		for block in iter(lambda: fh.read(2**20), b''):
+			file_hash.update(block)
+
+	finally:
+		fh.close()
+
+	return filename, file_hash.hexdigest()
+
+def CacheFilename(step, filenames, parameters):
+	"""Returns the cache file for the processing step of the source files with the given parameters,
+	a missing (optional) source file is None"""
+
+	key	= repr([step, [FileSignature(filename) if filename is not None else None for filename in filenames], parameters])
+
+	return os.path.join(cache_directory, step+'_'+hashlib.sha1(key.encode('utf-8')).hexdigest()+'.npz')
+
+def LoadCache(filename_cache):
+	"""Returns the list of arrays in the cache file, None if not available (or incomplete)"""
+
+	if not os.path.exists(filename_cache):
+		return None
+
+	try:
+		fh	= np.load(filename_cache)
+		result	= []
+
+		for result_i in range(int(fh['number_results'])):
+			data	= fh['data_'+str(result_i)]
+			result.append(ma.masked_array(data, mask = fh['mask_'+str(result_i)]) if fh['masked_'+str(result_i)] else data)
+
+		fh.close()
+
+		return result
+
+	except (IOError, KeyError, ValueError):
+		#Incomplete or corrupt file, determine again
+		return None
+
+def SaveCache(filename_cache, result):
+	"""Stores the list of (masked) arrays in the cache file"""
+
+	arrays	= {'number_results': len(result)}
+
+	for result_i in range(len(result)):
+		arrays['data_'+str(result_i)]	= ma.getdata(result[result_i])
+		arrays['mask_'+str(result_i)]	= ma.getmaskarray(result[result_i])
+		arrays['masked_'+str(result_i)]	= ma.isMaskedArray(result[result_i])
+
+	if not os.path.exists(cache_directory):
+		try:
+			os.makedirs(cache_directory)
+
+		except OSError:
+			#Created by another process in the meantime
+			pass
+
+	#Write to a temporary file first, so a cache file is always complete
+	filename_temp	= filename_cache[:-4]+'_'+str(os.getpid())+'.tmp.npz'
+	np.savez_compressed(filename_temp, **arrays)
+	os.rename(filename_temp, filename_cache)
+
+def CachedSeries(step, filenames, parameters, function, *arguments):
+	"""Returns the list of arrays of function(*arguments), which is derived from the source files with the
+	parameters of choice, from the cache if the same step was already done for the same source files
+	Change the step name when the processing itself changes"""
+
+	filename_cache	= CacheFilename(step, filenames, parameters)
+	result		= LoadCache(filename_cache)
+
+	if result is None:
+		result	= list(function(*arguments))
+		SaveCache(filename_cache, result)
+
+	return result
+
+def YearlyConverterFile(filename, variables, month_start = 1, month_end = 12):
+	"""Reads the variables and returns the yearly time and the yearly averages of each variable"""
+
+	data		= ReadVariables(filename, ['time'] + list(variables))
+	time_year, data_year	= YearlyConverterBatch(data[0], data[1:], month_start, month_end)
+
+	return [time_year] + list(data_year)
+
+def YearlySeries(filename, variables, month_start = 1, month_end = 12):
+	"""Returns the yearly time and the yearly averages of the variables of choice, from the cache if available"""
+
+	result		= CachedSeries('yearly', [filename], [list(variables), month_start, month_end], YearlyConverterFile, filename, variables, month_start, month_end)
+
+	return result[0], result[1:]
@@ -0,0 +1,165 @@
+#Functions for the linear trend and its significance, following Santer et al. (2000)
+
+import numpy as np
+import numpy.ma as ma
+from scipy import stats
+
+#Significance levels (two-sided) for which the critical values are determined
+sig_levels	= np.arange(50, 100, 0.5) / 100.0
+
+#Memoized critical values for each effective sample size, N_eff: t_crit
+t_crit_table	= {}
+
+def CriticalValues(N_eff):
+	"""Returns the critical values (two-sided) at all significance levels for the
+	effective sample size(s), the values are computed once for each N_eff and cached"""
+
+	N_eff		= np.asarray(N_eff, dtype = 'int64')
+	N_eff_missing	= [N_eff_i for N_eff_i in np.unique(N_eff) if N_eff_i not in t_crit_table]
+
+	if len(N_eff_missing) > 0:
+		#Only call the percent point function for the new sample sizes
+		t_crit	= stats.t.ppf((1.0 + sig_levels[None]) / 2.0, np.asarray(N_eff_missing)[:, None] - 2)
+
+		for N_eff_i, t_crit_i in zip(N_eff_missing, t_crit):
+			t_crit_table[N_eff_i]	= t_crit_i
+
+	if N_eff.ndim == 0:
+		return t_crit_table[N_eff.item()]
+
+	return np.asarray([t_crit_table[N_eff_i] for N_eff_i in N_eff.ravel()]).reshape(N_eff.shape + sig_levels.shape)
+
+def SignificanceLevel(t_value, N_eff):
+	"""Returns the highest significance level for which the absolute Student-T value
+	exceeds the critical value, 0 if none"""
+
+	if N_eff <= 2 or not np.isfinite(t_value):
+		#No degrees of freedom left, or no trend value
+		return 0.0
+
+	#The critical values increase with the significance level
+	sig_count	= np.searchsorted(CriticalValues(N_eff), np.fabs(t_value), side = 'left')
+
+	if sig_count == 0:
+		return 0.0
+
+	return sig_levels[sig_count - 1]
+
+def SignificantTrend(time, data):
+	"""Finds whether trend is significant
+	Returns the trend and if it significant (= 1)"""
+
+	#Set time similar to Santer et al. (2000), time array from 1 till N
+	#Statistical significance of trends and trend differences in layer-average atmospheric temperature time series
+	time		= np.arange(1, len(time) + 1)
+
+	#Determine the detrended time series
+	trend, base 	= np.polyfit(time, data, 1)
+	data_res	= data - ((trend * time) + base)
+
+	#Effective sample size, based on the lag-1 correlation
+	corr_1		= np.corrcoef(data_res[:-1], data_res[1:])[0, 1]
+	N_eff		= int(len(time) * (1.0 - corr_1) / (1.0 + corr_1))
+
+	#Determine the variance of the anomalies
+	data_var	= np.sum(data_res**2.0) / (N_eff - 2.0)
+
+	#Determine the standard error
+	standard_error	=  np.sqrt(data_var) / np.sqrt(np.sum((time - np.mean(time))**2.0))
+
+	#Determine the Student-T value
+	t_value		= trend / standard_error
+
+	#Get the highest significance level from the cached critical values (two-sided)
+	significant	= SignificanceLevel(t_value, N_eff)
+
+	return trend, np.sqrt(standard_error), significant
+
+def SignificantTrendBatch(time, data, axis = 0):
+	"""Finds the trend and its significance for a stack of series in one call,
+	for example (N, T) with axis = 1 or (T, lat, lon) with axis = 0
+	Returns the trend, the square root of the standard error (as for SignificantTrend)
+	and the significance level, all with the shape of the non-time dimensions
+	Series with masked values are masked in the output"""
+
+	data		= ma.masked_invalid(ma.asarray(data, dtype = float))
+	data		= ma.array(np.moveaxis(ma.getdata(data), axis, 0), mask = np.moveaxis(ma.getmaskarray(data), axis, 0))
+	mask		= np.any(ma.getmaskarray(data), axis = 0)
+	data		= ma.filled(data, 0.0).reshape((len(data), -1))
+
+	#Set time similar to Santer et al. (2000), time array from 1 till N
+	time		= np.arange(1, len(time) + 1, dtype = float)
+	time_anom	= time - np.mean(time)
+	time_var	= np.sum(time_anom**2.0)
+
+	#Closed-form ordinary least squares for all the series
+	data_mean	= np.mean(data, axis = 0)
+	trend		= np.dot(time_anom, data) / time_var
+	base		= data_mean - trend * np.mean(time)
+	data_res	= data - (time[:, None] * trend + base)
+
+	with np.errstate(divide = 'ignore', invalid = 'ignore'):
+		#Effective sample size, based on the lag-1 correlation
+		res_1		= data_res[:-1] - np.mean(data_res[:-1], axis = 0)
+		res_2		= data_res[1:] - np.mean(data_res[1:], axis = 0)
+		corr_1		= np.sum(res_1 * res_2, axis = 0) / np.sqrt(np.sum(res_1**2.0, axis = 0) * np.sum(res_2**2.0, axis = 0))
+		N_eff		= np.trunc(len(time) * (1.0 - corr_1) / (1.0 + corr_1))
+
+		#Determine the variance of the anomalies and the standard error
+		data_var	= np.sum(data_res**2.0, axis = 0) / (N_eff - 2.0)
+		standard_error	= np.sqrt(data_var) / np.sqrt(time_var)
+
+		#Determine the Student-T value
+		t_value		= np.fabs(trend / standard_error)
+
+		#Get the highest significance level from the cached critical values (two-sided),
+		#each distinct effective sample size is looked-up once
+		significant	= np.zeros(len(t_value))
+		N_eff		= np.where(np.isfinite(N_eff), N_eff, 0.0).astype('int64')
+
+		for N_eff_i in np.unique(N_eff[N_eff > 2]):
+			index			= np.where((N_eff == N_eff_i) & np.isfinite(t_value))[0]
+			sig_count		= np.searchsorted(CriticalValues(N_eff_i), t_value[index], side = 'left')
+			significant[index]	= np.where(sig_count > 0, sig_levels[np.maximum(sig_count - 1, 0)], 0.0)
+
+		standard_error	= np.sqrt(standard_error)
+
+	shape_out	= mask.shape
+
+	return ma.masked_array(trend.reshape(shape_out), mask = mask), ma.masked_array(standard_error.reshape(shape_out), mask = mask), ma.masked_array(significant.reshape(shape_out), mask = mask)
+
+def TrendSections(data, section_length_min = 2):
+	"""Determines the linear trend (per time step) over all sections of the time series,
+	from the prefix sums of t, y, t * y and t^2 each section costs a few array operations
+	The time axis is the last axis of data, e.g. (T) or (members, T)
+	Returns a (..., start, end) matrix, sections shorter than section_length_min are masked"""
+
+	data		= np.asarray(ma.filled(ma.asarray(data, dtype = float), np.nan))
+	number_times	= data.shape[-1]
+
+	#Remove the means to reduce the round-off errors in the sums
+	time		= np.arange(number_times) - (number_times - 1) / 2.0
+	data		= data - np.mean(data, axis = -1)[..., None]
+
+	#Prefix sums, with a leading zero
+	time_sum	= np.append(0.0, np.cumsum(time))
+	time_2_sum	= np.append(0.0, np.cumsum(time**2.0))
+	data_sum	= np.concatenate((np.zeros(data.shape[:-1] + (1,)), np.cumsum(data, axis = -1)), axis = -1)
+	data_time_sum	= np.concatenate((np.zeros(data.shape[:-1] + (1,)), np.cumsum(data * time, axis = -1)), axis = -1)
+
+	#The sums over each section [start, end]
+	length		= np.arange(1, number_times + 1)[None] - np.arange(number_times)[:, None]
+	time_S		= time_sum[None, 1:] - time_sum[:-1, None]
+	time_2_S	= time_2_sum[None, 1:] - time_2_sum[:-1, None]
+	data_S		= data_sum[..., None, 1:] - data_sum[..., :-1, None]
+	data_time_S	= data_time_sum[..., None, 1:] - data_time_sum[..., :-1, None]
+
+	mask		= length < max(section_length_min, 2)
+	length		= np.where(mask, 1, length)
+
+	with np.errstate(divide = 'ignore', invalid = 'ignore'):
+		trend	= (data_time_S - time_S * data_S / length) / (time_2_S - time_S**2.0 / length)
+
+	mask		= np.broadcast_to(mask, trend.shape) | ~np.isfinite(trend)
+
+	return ma.masked_array(np.where(mask, 0.0, trend), mask = mask)
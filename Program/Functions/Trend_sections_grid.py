@@ -0,0 +1,127 @@
+#Functions for the start-year x end-year (normalised) SDSL trend analysis on the grid of the (Caribbean) domain,
+#the results are streamed in spatial tiles to a chunked netCDF file
+
+import numpy as np
+import numpy.ma as ma
+import netCDF4 as netcdf
+
+from Functions.Data_access import DomainIndices, LayoutFilename
+from Functions.Yearly_converter import YearAxis, YearlyConverter
+from Functions.Significant_trend import TrendSections
+
+#Memory (bytes) for the section matrices of a tile and the number of (section, section) float arrays which
+#TrendSections holds at the same time for each point (sums, trend, mask and temporaries)
+memory_bytes	= 2**28
+section_arrays	= 8
+
+def TileSize(number_years, itemsize = 8):
+	"""Returns the tile size (points along each side) for which the section matrices of a tile fit in memory"""
+
+	number_points	= max(1, memory_bytes // (section_arrays * itemsize * number_years**2))
+
+	return max(1, int(np.sqrt(number_points)))
+
+def TrendSectionsGrid(filename_in, filename_out, ssh_global_year, steric_global_year, variable = 'SSH', month_start = 1, month_end = 12, section_length_min = 25,
+			lon_min = 270, lon_max = 330, lat_min = -5, lat_max = 25, tile_size = None):
+	"""Determines the normalised SDSL trend over all sections (start year, end year) for each grid point of the domain of choice
+	filename_in contains the monthly sea surface height (time, y, x) in cm, the yearly global mean (ssh_global_year)
+	is removed and the drift-corrected global steric sea-level rise (steric_global_year, relative to the first year) is added
+	The domain is processed in tiles of tile_size x tile_size points (default from the memory budget, see TileSize)
+	Each point is stored as a single chunk, so the sensitivity panel of a point is a single read"""
+
+	#The time series of the tiles, from the copy chunked for series when available
+	fh_in		= netcdf.Dataset(LayoutFilename(filename_in, 'series'), 'r')
+	time		= fh_in.variables['time'][:]
+	ssh_var		= fh_in.variables[variable]
+	dim_y, dim_x	= ssh_var.dimensions[1:]
+
+	lon		= fh_in.variables['lon'][:]
+	lat		= fh_in.variables['lat'][:]
+	domain_y, domain_x	= DomainIndices(lon, lat, lon_min, lon_max, lat_min, lat_max)
+	number_y	= domain_y.stop - domain_y.start
+	number_x	= domain_x.stop - domain_x.start
+
+	#The trend of the global steric contribution, the same for all grid points
+	trend_steric	= TrendSections(steric_global_year, section_length_min)
+	number_years	= len(steric_global_year)
+	time_year	= YearAxis(time, month_start, month_end)[1]
+	tile_size	= TileSize(number_years) if tile_size is None else tile_size
+
+	#-----------------------------------------------------------------------------------------
+	fh_out		= netcdf.Dataset(filename_out, 'w')
+
+	fh_out.createDimension('year', number_years)
+	fh_out.createDimension(dim_y, number_y)
+	fh_out.createDimension(dim_x, number_x)
+
+	#Copy the grid of the domain (1-D or curvilinear)
+	for coord in ['lat', 'lon']:
+		coord_in	= fh_in.variables[coord]
+		coord_out	= fh_out.createVariable(coord, float, coord_in.dimensions)
+
+		if coord_in.ndim == 2:
+			coord_out[:]	= coord_in[domain_y, domain_x]
+
+		else:
+			coord_out[:]	= coord_in[domain_y if coord == 'lat' else domain_x]
+
+		if 'units' in coord_in.ncattrs():
+			coord_out.units	= coord_in.units
+
+	year_out	= fh_out.createVariable('year', float, ('year',))
+	trend_out	= fh_out.createVariable('SSH_trend_norm', 'f4', (dim_y, dim_x, 'year', 'year'), zlib = True, chunksizes = (1, 1, number_years, number_years), fill_value = 1.0e20)
+
+	year_out.units		= 'Days since 0001-01-01 00:00:00 UTC'
+	trend_out.long_name	= 'Normalised SDSL trend, (start year, end year)'
+	trend_out.section_length_min	= section_length_min
+
+	for y_start in range(0, number_y, tile_size):
+		for x_start in range(0, number_x, tile_size):
+			#The tile relative to the domain, only read the hyperslab of the tile
+			tile_y, tile_x	= slice(y_start, min(y_start + tile_size, number_y)), slice(x_start, min(x_start + tile_size, number_x))
+			ssh		= ssh_var[:, domain_y.start + tile_y.start:domain_y.start + tile_y.stop, domain_x.start + tile_x.start:domain_x.start + tile_x.stop]
+
+			ssh_year		= YearlyConverter(time, ssh, month_start, month_end)[1]
+
+			#Remove the global mean and set the first year to 0, then add the global steric contribution
+			ssh_year		= ssh_year - ssh_global_year[:, None, None]
+			ssh_year		= ssh_year - ssh_year[0]
+			ssh_year		= ssh_year + steric_global_year[:, None, None]
+
+			#Trends over all sections, time as last axis: (y, x, start, end)
+			trend_tile		= TrendSections(np.moveaxis(ma.filled(ssh_year, np.nan), 0, -1), section_length_min)
+			trend_out[tile_y, tile_x]	= trend_tile / trend_steric
+
+	year_out[:]	= time_year
+
+	fh_in.close()
+	fh_out.close()
+
+def ReadinTrendSectionsPoint(filename, lon_point, lat_point):
+	"""Reads the normalised SDSL trend over all sections for the grid point nearest to (lon, lat)
+	Returns the years, the point's (lon, lat) and the (start year, end year) matrix"""
+
+	fh		= netcdf.Dataset(filename, 'r')
+
+	time_year	= fh.variables['year'][:]
+	lon		= fh.variables['lon'][:]
+	lat		= fh.variables['lat'][:]
+
+	#Longitude difference on the 0 - 360 range (e.g. -75 and 285), as for the domain
+	lon_diff	= (lon - lon_point + 180.0) % 360.0 - 180.0
+
+	if lon.ndim == 1:
+		#Regular grid
+		y_i, x_i	= np.argmin(np.fabs(lat - lat_point)), np.argmin(np.fabs(lon_diff))
+		lon_i, lat_i	= lon[x_i], lat[y_i]
+
+	else:
+		#Curvilinear grid
+		y_i, x_i	= np.unravel_index(np.argmin(lon_diff**2.0 + (lat - lat_point)**2.0), lon.shape)
+		lon_i, lat_i	= lon[y_i, x_i], lat[y_i, x_i]
+
+	trend_sections	= fh.variables['SSH_trend_norm'][y_i, x_i]
+
+	fh.close()
+
+	return time_year, lon_i, lat_i, trend_sections
@@ -0,0 +1,191 @@
+#Functions for converting monthly time series and fields to yearly averages
+
+import datetime
+import numpy as np
+import numpy.ma as ma
+from numpy.lib.stride_tricks import as_strided
+
+#Take twice the amount of years for the month day (no leap year)
+month_days_all	= np.asarray([31., 28., 31., 30., 31., 30., 31., 31., 30., 31., 30., 31., 31., 28., 31., 30., 31., 30., 31., 31., 30., 31., 30., 31.])
+
+#Ordinal of 1970-01-01, the reference date of numpy's datetime64
+ordinal_epoch	= datetime.date(1970, 1, 1).toordinal()
+
+def YearDecoder(time):
+	"""Returns the calendar year of each time stamp (days since 0001-01-01),
+	decoded in a single vectorised step"""
+
+	days	= np.floor(np.asarray(time, dtype = float)).astype('int64') - ordinal_epoch
+
+	return days.astype('datetime64[D]').astype('datetime64[Y]').astype('int64') + 1970
+
+def YearOrdinal(year):
+	"""Returns the ordinal of 1 January for each year"""
+
+	year	= np.asarray(year, dtype = 'int64') - 1970
+
+	return year.astype('datetime64[Y]').astype('datetime64[D]').astype('int64') + ordinal_epoch
+
+def MonthWeights(month_start = 1, month_end = 12):
+	"""Returns the normalised month-day weights over the months of choice"""
+
+	if month_start < 1 or month_end > len(month_days_all) or month_start > month_end:
+		raise ValueError('Invalid month window: '+str(month_start)+' - '+str(month_end))
+
+	month_days	= month_days_all[month_start - 1:month_end]
+
+	return month_days / np.sum(month_days)
+
+def MonthView(data, month_start, month_end, number_years):
+	"""Returns a (years, months, points) view on the monthly data without copying,
+	all trailing dimensions are flattened to a single points axis"""
+
+	if number_years > 0 and len(data) < (number_years - 1) * 12 + month_end:
+		#The view would extend beyond the data
+		raise ValueError('Data ('+str(len(data))+' months) is shorter than the time axis ('+str(number_years)+' years)')
+
+	data		= np.ascontiguousarray(data)
+	data		= data.reshape((len(data), -1))
+	stride_time	= data.strides[0]
+
+	return as_strided(data[month_start - 1:], shape = (number_years, month_end - month_start + 1, data.shape[1]), strides = (12 * stride_time, stride_time, data.strides[1]))
+
+def YearAxis(time, month_start = 1, month_end = 12):
+	"""Returns the number of years and the yearly time axis (ordinal of 1 January)
+	for the months of choice, the time axis is decoded only once"""
+
+	if month_end <= 12:
+		#Normal average over a single year, for example, January 100 - December 100
+		number_years	= len(time) // 12
+
+	else:
+		#If you take the average, for example, over November 100 - May 101
+		#Take year 101 as the average over this period
+		#There is one year less compared to the period analysed
+		number_years	= len(time) // 12 - 1
+
+	#The year is defined as the year of the first month of each 12-month block
+	year		= YearDecoder(np.asarray(time)[0:number_years * 12:12])
+
+	if month_end	>= 13:
+		#If average is taken over, for example, November 100 - May 101, the year is defined as 101
+		year = year + 1
+
+	return number_years, YearOrdinal(year).astype(float)
+
+def MonthContraction(data, number_years, month_start = 1, month_end = 12):
+	"""Contracts the (years, months) view of the selected months with the month-day weights"""
+
+	month_days	= MonthWeights(month_start, month_end)
+	data_month	= MonthView(ma.filled(data, 0.0), month_start, month_end, number_years)
+	data_year	= np.einsum('ijk,j->ik', data_month, month_days)
+	data_year	= ma.masked_array(data_year.reshape((number_years,) + np.shape(data)[1:]))
+
+	if ma.is_masked(data):
+		#Only mask the years for which all the selected months are masked
+		mask_month	= MonthView(ma.getmaskarray(data), month_start, month_end, number_years)
+		data_year.mask	= np.all(mask_month, axis = 1).reshape(data_year.shape)
+
+	return data_year
+
+def YearlyConverter(time, data, month_start = 1, month_end = 12):
+	"""Determines the averaged value over different months of choice,
+	default is set to January - December
+	The first axis of data is the (monthly) time axis, any trailing dimensions
+	(e.g. lat, lon, depth) are averaged in the same call"""
+
+	#Check the month window before decoding the time axis
+	MonthWeights(month_start, month_end)
+
+	number_years, time_year	= YearAxis(time, month_start, month_end)
+	data_year		= MonthContraction(data, number_years, month_start, month_end)
+
+	return time_year, data_year
+
+def YearlyConverterBatch(time, data, month_start = 1, month_end = 12):
+	"""Determines the averaged value over the months of choice for several series
+	which share the same time axis, the time axis is decoded once and all the series
+	are converted in one pass
+	Data is either a dictionary of series or a stack with the series along the first axis,
+	the yearly averages are returned in the same form"""
+
+	MonthWeights(month_start, month_end)
+
+	number_years, time_year	= YearAxis(time, month_start, month_end)
+
+	if isinstance(data, dict):
+		keys	= list(data.keys())
+		series	= [data[key] for key in keys]
+
+	else:
+		keys	= None
+		series	= [data[series_i] for series_i in range(len(data))]
+
+	if len(series) == 0:
+		return time_year, ({} if keys is not None else ma.masked_all((0, number_years)))
+
+	if len(set([np.shape(series_i) for series_i in series])) == 1:
+		#Put the series along the last axis, the monthly time axis remains the first axis
+		data_all	= np.stack([ma.filled(series_i, 0.0) for series_i in series], axis = -1)
+
+		if any([ma.is_masked(series_i) for series_i in series]):
+			data_all	= ma.masked_array(data_all, mask = np.stack([ma.getmaskarray(series_i) for series_i in series], axis = -1))
+
+		data_year	= MonthContraction(data_all, number_years, month_start, month_end)
+		data_year	= [data_year[..., series_i] for series_i in range(len(series))]
+
+	else:
+		#Series with different dimensions, only the decoded time axis is shared
+		data_year	= [MonthContraction(series_i, number_years, month_start, month_end) for series_i in series]
+
+	if keys is not None:
+		return time_year, dict(zip(keys, data_year))
+
+	return time_year, ma.masked_array(data_year)
+
+def SeasonalSweep(time, data):
+	"""Determines the averaged value for all the month windows in one pass,
+	month_start = 1 - 12 and month_end = 1 - 24 (13 = January (+ 1), ...)
+	Returns the yearly time axis (January - December years) and a (start, end, year, ...) cube,
+	cube[month_start - 1, month_end - 1] equals YearlyConverter(time, data, month_start, month_end)
+	For the windows over two years (month_end >= 13) the value is stored at the year of month_end,
+	the first year is then masked, windows with month_end < month_start are masked"""
+
+	number_years, time_year	= YearAxis(time, 1, 12)
+
+	data_shape	= np.shape(data)[1:]
+	data_month	= ma.filled(data, 0.0)[:number_years * 12].reshape((number_years * 12, -1))
+	mask_month	= ma.getmaskarray(data)[:number_years * 12].reshape((number_years * 12, -1))
+
+	#Cumulative sums of the day-weighted monthly values and of the number of unmasked months
+	month_days	= np.tile(month_days_all[:12], number_years)
+	data_cumsum	= np.zeros((number_years * 12 + 1, data_month.shape[1]))
+	count_cumsum	= np.zeros((number_years * 12 + 1, data_month.shape[1]), dtype = 'int64')
+
+	np.cumsum(data_month * month_days[:, None], axis = 0, out = data_cumsum[1:])
+	np.cumsum(~mask_month, axis = 0, out = count_cumsum[1:])
+
+	#Month index of the start (first month) and end (after the last month) for each year
+	month_index	= np.arange(number_years) * 12
+	start_index	= month_index[None] + np.arange(12)[:, None]
+	end_index	= np.minimum(month_index[None] + np.arange(1, 25)[:, None], number_years * 12)
+
+	#The total number of days for each window
+	days_cumsum	= np.append(0.0, np.cumsum(month_days_all))
+	days_window	= days_cumsum[None, 1:] - days_cumsum[:12, None]
+	days_window	= np.where(days_window > 0.0, days_window, 1.0)	#Invalid windows, masked below
+
+	data_window	= (data_cumsum[end_index][None] - data_cumsum[start_index][:, None]) / days_window[:, :, None, None]
+	count_window	= count_cumsum[end_index][None] - count_cumsum[start_index][:, None]
+
+	#Windows which end before they start, or which end after the last month, are not valid
+	valid_window	= np.arange(1, 25)[None, :, None] > np.arange(12)[:, None, None]
+	valid_window	= valid_window & (month_index[None, None] + np.arange(1, 25)[None, :, None] <= number_years * 12)
+	mask_window	= (count_window == 0) | ~valid_window[..., None]
+
+	#Shift the windows over two years to the year of month_end
+	data_cube	= ma.masked_all((12, 24, number_years, data_month.shape[1]))
+	data_cube[:, :12]	= ma.masked_array(data_window[:, :12], mask = mask_window[:, :12])
+	data_cube[:, 12:, 1:]	= ma.masked_array(data_window[:, 12:, :-1], mask = mask_window[:, 12:, :-1])
+
+	return time_year, data_cube.reshape((12, 24, number_years) + data_shape)
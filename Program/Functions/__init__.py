@@ -0,0 +1 @@
+#Shared functions for the analysis scripts
@@ -4,12 +4,17 @@ from pylab import *
 import numpy
 import datetime
 import time
-import glob, os
+import glob, os, sys
 import math
 import netCDF4 as netcdf
 import matplotlib.colors as colors
 from mpl_toolkits.basemap import Basemap
 
+#Shared functions, relative to this directory
+sys.path.append('../../')
+from Functions.Data_access import ReadVariablesDomain
+from Functions.Product_registry import RequireProduct
+
 #Making pathway to folder with all data
 directory	= '../../../Data/HR-CESM/'
 
@@ -29,14 +34,11 @@ month_end	= 12	#12 = December, 13 = January (+ 1), 14 = February (+ 1), ...
 sig_level	= 95.0
 #-----------------------------------------------------------------------------------------
 
-HEAT_data = netcdf.Dataset(directory+'Ocean/UV_trend_depth_'+str(depth_min)+'-'+str(depth_max)+'_m_year_'+str(year_start)+'-'+str(year_end)+'_month_'+str(month_start)+'-'+str(month_end)+'.nc', 'r')
-
-lon		= HEAT_data.variables['lon'][:] 			
-lat		= HEAT_data.variables['lat'][:] 			
-vel_trend	= HEAT_data.variables['VEL_trend'][:] 
-vel_trend_sig	= HEAT_data.variables['VEL_trend_sig'][:] 
+#Get the file of the product, which is generated first when not available
+filename		= RequireProduct('UV_trend', 'HR-CESM', depth_min = depth_min, depth_max = depth_max, year_start = year_start, year_end = year_end, month_start = month_start, month_end = month_end)
 
-HEAT_data.close()
+#Only read the index rectangle enclosing the domain of the map (one extra grid point to close the contours)
+lon, lat, vel_trend, vel_trend_sig	= ReadVariablesDomain(filename, ['lon', 'lat', 'VEL_trend', 'VEL_trend_sig'], 270, 330, -5, 25, margin = 1)
 
 #Set all the non-significant trends to masked elements
 vel_trend	= ma.masked_where(vel_trend_sig < (sig_level / 100.0), vel_trend)
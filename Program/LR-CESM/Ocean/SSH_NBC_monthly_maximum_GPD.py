@@ -0,0 +1,117 @@
+#Program fits the generalised Pareto distribution to the declustered peaks over threshold
+
+from pylab import *
+import numpy
+import datetime
+import time
+import glob, os, sys
+import netCDF4 as netcdf
+
+#Shared functions, relative to this directory
+sys.path.append('../../')
+from Functions.GPD_fitting import GPDReturnLevel, POTAnalysis
+
+#Making pathway to folder with all data
+directory 	= '../../../Data/LR-CESM/'
+
+#-----------------------------------------------------------------------------------------
+#--------------------------------MAIN SCRIPT STARTS HERE----------------------------------
+#-----------------------------------------------------------------------------------------
+
+trend_type	= 0
+quantile	= 0.9	#Threshold quantile of the monthly maxima
+run_length	= 1	#Number of months below the threshold which separate two clusters
+method		= 'mle'	#GPD fit: 'mle' (maximum likelihood) or 'pwm' (probability weighted moments)
+#-----------------------------------------------------------------------------------------
+
+#Read the data once, decluster the exceedances and fit the GPD to the full record
+analysis	= POTAnalysis(directory, quantile, run_length, trend_type, method)
+
+time_all, ssh	= analysis['time'], analysis['ssh']
+threshold	= analysis['threshold']
+peak		= analysis['peak']
+shape, scale	= analysis['shape'], analysis['scale']
+rate		= analysis['rate']
+
+print threshold, len(peak), shape, scale
+print analysis['return_level']
+#-----------------------------------------------------------------------------------------
+
+fig, ax = subplots()
+
+graph_ssh	= ax.plot_date(time_all, ssh, '-k', linewidth = 1.5, label = '$\eta_M^{Max}$')
+graph_peak	= ax.plot_date(time_all[peak], ssh[peak], 'or', label = 'Cluster maxima')
+graph_threshold	= ax.plot_date([time_all[0], time_all[-1]], [threshold, threshold], '--b', linewidth = 2.0, label = 'Threshold')
+
+ax.set_xlabel('Model year')
+ax.set_ylabel('Dynamic sea level (cm)')
+ax.grid()
+
+ax.set_xticks([	datetime.datetime(2000, 1, 1).toordinal(),
+		datetime.datetime(2020, 1, 1).toordinal(),
+		datetime.datetime(2040, 1, 1).toordinal(),
+		datetime.datetime(2060, 1, 1).toordinal(),
+		datetime.datetime(2080, 1, 1).toordinal(),
+		datetime.datetime(2100, 1, 1).toordinal()])
+
+graphs	      = graph_ssh + graph_peak + graph_threshold
+
+legend_labels = [l.get_label() for l in graphs]
+ax.legend(graphs, legend_labels, loc='upper right',
+ 		  ncol=3, fancybox=True, shadow=False, numpoints = 1)
+
+ax.set_title('LR-CESM')
+
+#-----------------------------------------------------------------------------------------
+
+#Threshold-stability diagnostics, mean residual life and the modified scale and shape
+fig, ax = subplots()
+
+graph_mean	= ax.plot(analysis['thresholds'], analysis['mean_excess'], '-k', linewidth = 2.0, label = 'Mean excess')
+graph_scale	= ax.plot(analysis['thresholds'], analysis['scale_modified'], '-r', linewidth = 2.0, label = 'Modified scale')
+
+ax.axvline(x = threshold, color = 'b', linestyle = '--', linewidth = 2.0)
+ax.set_xlabel('Threshold (cm)')
+ax.set_ylabel('Mean excess and modified scale (cm)')
+ax.grid()
+
+ax2 		= ax.twinx()
+graph_shape	= ax2.plot(analysis['thresholds'], analysis['shape_all'], '-c', linewidth = 2.0, label = 'Shape')
+
+ax2.set_ylabel('Shape', color = 'c')
+ax2.set_ylim(-2, 1)
+
+for tl in ax2.get_yticklabels():
+    tl.set_color('c')
+
+graphs	      = graph_mean + graph_scale + graph_shape
+
+legend_labels = [l.get_label() for l in graphs]
+ax.legend(graphs, legend_labels, loc='lower left',
+ 		  ncol=1, fancybox=True, shadow=False, numpoints = 1)
+
+ax.set_title('LR-CESM')
+
+#-----------------------------------------------------------------------------------------
+
+return_period	= np.exp(np.linspace(np.log(1.0 / rate), np.log(1000.0), 1000))
+return_level	= GPDReturnLevel(return_period, threshold, shape, scale, rate)
+
+#Empirical return periods of the cluster maxima (years)
+peak_sorted	= np.sort(ssh[peak])[::-1]
+peak_period	= (len(ssh) / 12.0) / np.arange(1, len(peak) + 1)
+
+fig, ax = subplots()
+
+ax.plot(return_period, return_level, '-k', linewidth = 2.0)
+ax.plot(peak_period, peak_sorted, 'ok')
+
+ax.set_xlim(1, 1000)
+ax.set_xscale('log')
+ax.set_xlabel('Return time (years)')
+ax.set_ylabel('Dynamic sea level (cm)')
+ax.grid()
+
+ax.text(0.01, 0.95, 'LR-CESM', size = 16, horizontalalignment='left', verticalalignment='center', transform=ax.transAxes)
+
+show()
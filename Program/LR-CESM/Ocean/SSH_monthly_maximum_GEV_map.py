@@ -0,0 +1,98 @@
+#Program determines and plots the GEV return-level maps of the monthly maximum sea surface height
+
+from pylab import *
+import numpy
+import datetime
+import time
+import glob, os, sys
+import math
+import netCDF4 as netcdf
+import matplotlib.colors as colors
+from mpl_toolkits.basemap import Basemap
+
+#Shared functions, relative to this directory
+sys.path.append('../../')
+from Functions.Product_registry import RequireProduct
+
+#-----------------------------------------------------------------------------------------
+#--------------------------------MAIN SCRIPT STARTS HERE----------------------------------
+#-----------------------------------------------------------------------------------------
+
+trend_type	= 0
+return_period	= 5.0		#Return period (years)
+method		= 'lmoments'	#GEV fit: 'lmoments' (fast L-moment estimates) or 'mle' (maximum likelihood)
+processes	= None		#Number of processes for the tiles (None = all cores, 1 = serial)
+#-----------------------------------------------------------------------------------------
+
+#The workers of the process pool import this script (spawn start method), only run it as the main program
+if __name__ == '__main__':
+
+	#Get the file of the maps (GEV fit for each grid point, 2000 - 2029 and 2070 - 2099), which are generated first when not available
+	filename_map	= RequireProduct('SSH_monthly_maximum_GEV', 'LR-CESM', return_period = return_period, method = method, trend_type = trend_type, processes = processes)
+
+	HEAT_data 		= netcdf.Dataset(filename_map, 'r')
+
+	lon			= HEAT_data.variables['lon'][:] 			
+	lat			= HEAT_data.variables['lat'][:] 			
+	return_level		= HEAT_data.variables['return_level'][0] 
+	return_level_change	= HEAT_data.variables['return_level_change'][:] 
+
+	HEAT_data.close()
+
+	#-----------------------------------------------------------------------------------------
+
+	fig, ax = plt.subplots()
+
+	m = Basemap(
+	projection = 'merc',
+	llcrnrlat=-5, urcrnrlat=25,
+	llcrnrlon=270, urcrnrlon=330,
+	resolution='l', area_thresh=0.01
+	) 
+
+	m.drawcoastlines(linewidth=0.2)
+	m.drawcountries()
+	m.fillcontinents(color='#cc9966',lake_color='#99ffff')
+	par = m.drawparallels(np.arange(-80,81,10),labels=[1,0,0,0])
+	mer = m.drawmeridians(np.arange(-180,180,20),labels=[0,0,0,1])
+
+	x, y	= np.meshgrid(lon, lat)
+	x, y = m(x,y)
+
+	levels	= np.arange(-50, 50.1, 5)
+
+	CS	= m.contourf(x, y, return_level, levels, extend = 'both', cmap = 'RdBu_r')
+	cbar 	= m.colorbar(CS, ticks = np.arange(-50, 50.1, 25))
+	cbar.set_label('Return level (cm), 1:'+str(int(return_period))+' year')
+
+	ax.set_title('LR-CESM, 2000 - 2029')
+
+	#-----------------------------------------------------------------------------------------
+
+	fig, ax = plt.subplots()
+
+	m = Basemap(
+	projection = 'merc',
+	llcrnrlat=-5, urcrnrlat=25,
+	llcrnrlon=270, urcrnrlon=330,
+	resolution='l', area_thresh=0.01
+	) 
+
+	m.drawcoastlines(linewidth=0.2)
+	m.drawcountries()
+	m.fillcontinents(color='#cc9966',lake_color='#99ffff')
+	par = m.drawparallels(np.arange(-80,81,10),labels=[1,0,0,0])
+	mer = m.drawmeridians(np.arange(-180,180,20),labels=[0,0,0,1])
+
+	x, y	= np.meshgrid(lon, lat)
+	x, y = m(x,y)
+
+	levels	= np.arange(-10, 10.1, 1)
+
+	CS	= m.contourf(x, y, return_level_change, levels, extend = 'both', cmap = 'RdBu_r')
+	cbar 	= m.colorbar(CS, ticks = np.arange(-10, 10.1, 5))
+	cbar.set_label('Return level change (cm), 1:'+str(int(return_period))+' year')
+
+	ax.set_title('LR-CESM, 2070 - 2099 minus 2000 - 2029')
+
+	show()
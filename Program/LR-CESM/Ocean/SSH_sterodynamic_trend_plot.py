@@ -4,12 +4,17 @@ from pylab import *
 import numpy
 import datetime
 import time
-import glob, os
+import glob, os, sys
 import math
 import netCDF4 as netcdf
 import matplotlib.colors as colors
 from mpl_toolkits.basemap import Basemap
 
+#Shared functions, relative to this directory
+sys.path.append('../../')
+from Functions.Data_access import ReadVariablesDomain
+from Functions.Product_registry import RequireProduct
+
 #Making pathway to folder with all data
 directory 	= '../../../Data/LR-CESM/'
 
@@ -26,15 +31,11 @@ month_end		= 12	#12 = December, 13 = January (+ 1), 14 = February (+ 1), ...
 sig_level		= 95.0
 #-----------------------------------------------------------------------------------------
 
-HEAT_data 		= netcdf.Dataset(directory+'/Ocean/SSH_sterodynamic_trend_year_'+str(year_start)+'-'+str(year_end)+'_month_'+str(month_start)+'-'+str(month_end)+'.nc', 'r')
+#Get the file of the product, which is generated first when not available
+filename		= RequireProduct('SSH_sterodynamic_trend', 'LR-CESM', year_start = year_start, year_end = year_end, month_start = month_start, month_end = month_end)
 
-lon			= HEAT_data.variables['lon'][:] 			
-lat			= HEAT_data.variables['lat'][:] 			
-SSH_trend		= HEAT_data.variables['SSH_trend'][:] 
-SSH_trend_sig		= HEAT_data.variables['SSH_trend_sig'][:] 
-SSH_trend_norm		= HEAT_data.variables['SSH_trend_norm'][:] 
-SSH_trend_norm_sig	= HEAT_data.variables['SSH_trend_norm_sig'][:] 
-HEAT_data.close()
+#Only read the index rectangle enclosing the domain of the map (one extra grid point to close the contours)
+lon, lat, SSH_trend, SSH_trend_sig, SSH_trend_norm, SSH_trend_norm_sig	= ReadVariablesDomain(filename, ['lon', 'lat', 'SSH_trend', 'SSH_trend_sig', 'SSH_trend_norm', 'SSH_trend_norm_sig'], 270, 330, -5, 25, margin = 1)
 
 #Set all the non-significant trends to masked elements
 SSH_trend_sig		= ma.masked_where(SSH_trend_sig < (sig_level / 100.0), SSH_trend_sig)